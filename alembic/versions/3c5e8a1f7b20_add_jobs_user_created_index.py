@@ -0,0 +1,33 @@
+"""Add jobs (user_id, created_at DESC) index
+
+Revision ID: 3c5e8a1f7b20
+Revises: 991a1a1d8424
+Create Date: 2026-10-15 10:12:41.552310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c5e8a1f7b20'
+down_revision: Union[str, Sequence[str], None] = '991a1a1d8424'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_jobs_user_id_created_at',
+        'jobs',
+        ['user_id', sa.text('created_at DESC')],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_jobs_user_id_created_at', table_name='jobs')
@@ -0,0 +1,45 @@
+"""Store jobs.job_id as a native UUID
+
+Revision ID: 7d2f9c4b1a36
+Revises: 3c5e8a1f7b20
+Create Date: 2026-10-15 14:03:27.918402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2f9c4b1a36'
+down_revision: Union[str, Sequence[str], None] = '3c5e8a1f7b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.alter_column(
+            'jobs',
+            'job_id',
+            type_=sa.Uuid(),
+            existing_nullable=False,
+            postgresql_using='job_id::uuid',
+        )
+    else:
+        # Non-native backends store UUIDs as 32-char hex strings
+        op.execute("UPDATE jobs SET job_id = REPLACE(job_id, '-', '')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.alter_column(
+            'jobs',
+            'job_id',
+            type_=sa.String(),
+            existing_nullable=False,
+            postgresql_using='job_id::text',
+        )
@@ -0,0 +1,35 @@
+"""Add jobs (status, created_at DESC) and users.last_login indexes
+
+Revision ID: b4e81d0c5a92
+Revises: 7d2f9c4b1a36
+Create Date: 2026-10-15 16:40:08.274615
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4e81d0c5a92'
+down_revision: Union[str, Sequence[str], None] = '7d2f9c4b1a36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_jobs_status_created_at',
+        'jobs',
+        ['status', sa.text('created_at DESC')],
+        unique=False,
+    )
+    op.create_index('ix_users_last_login', 'users', ['last_login'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_last_login', table_name='users')
+    op.drop_index('ix_jobs_status_created_at', table_name='jobs')
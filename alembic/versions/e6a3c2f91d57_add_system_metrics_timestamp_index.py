@@ -0,0 +1,28 @@
+"""Add system_metrics.timestamp index
+
+Revision ID: e6a3c2f91d57
+Revises: b4e81d0c5a92
+Create Date: 2026-10-15 17:22:51.603318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6a3c2f91d57'
+down_revision: Union[str, Sequence[str], None] = 'b4e81d0c5a92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_system_metrics_timestamp', 'system_metrics', ['timestamp'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_system_metrics_timestamp', table_name='system_metrics')
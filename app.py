@@ -1,48 +1,89 @@
-from fastapi import FastAPI, UploadFile, File, BackgroundTasks, HTTPException, Depends, status, Request, Form, APIRouter
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, status, Request, Response, Form, APIRouter, Query
+from fastapi.responses import FileResponse, ORJSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
+from sqlalchemy import func, case, insert, select, or_
+from sqlalchemy.exc import IntegrityError
 from slowapi.errors import RateLimitExceeded
 from datetime import datetime, timedelta
+from functools import lru_cache
+from urllib.parse import quote
+import orjson
 import uuid
 import os
 import shutil
 import asyncio
 
-from src.agent.runner import run_batch_job
-from src.api.models import User, Job, get_db
+from src.api.models import User, Job, get_db, init_db, new_job_id
+from src.api.tasks import enqueue, process_assignment_job, send_welcome_email_task
+from src.api.cache import get_cached, set_cached, me_key, analytics_key, invalidate_user_async
 from src.api.auth import (
     get_password_hash,
-    authenticate_user, 
+    get_user_by_username,
     create_access_token,
     get_current_active_user,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
 from src.api.rate_limit import limiter, _rate_limit_exceeded_handler
 from pydantic import BaseModel
-from src.api.admin import router as admin_router
+from typing import List, Optional
+from src.api.admin import router as admin_router, admin_overview, run_metrics_rollup, METRICS_ROLLUP_SECONDS
 
 # New imports
-from src.utils.language_config import get_language_config, get_supported_languages
-from src.utils.email_service import send_welcome_email, send_job_completion_email
+from src.utils.language_config import get_language_config, get_supported_languages, SUPPORTED_LANGUAGES
+from src.utils.logger import setup_logging
 
 
 from src.api.auth import verify_password
 
 
+# Log records are written to stdout by a background thread, not in request handlers
+setup_logging()
+
 # Define base folders
 DATA_DIR = "data/api_jobs"
 INPUT_DIR = os.path.join(DATA_DIR, "input")
 OUTPUT_DIR = os.path.join(DATA_DIR, "output")
-os.makedirs(INPUT_DIR, exist_ok=True)
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+INPUT_PATH_PREFIX = INPUT_DIR + os.sep
+UPLOAD_BUFSIZE = 1 << 20  # 1 MiB copy buffer for assignment uploads
+DOCX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+# Optional nginx internal location mapped to OUTPUT_DIR (enables X-Accel-Redirect)
+DOWNLOAD_ACCEL_PREFIX = os.getenv("DOWNLOAD_ACCEL_PREFIX")
+_dirs_ready = False
+
+
+def ensure_dirs():
+    """Create the job input/output folders once per process"""
+    global _dirs_ready
+    if not _dirs_ready:
+        os.makedirs(INPUT_DIR, exist_ok=True)
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        _dirs_ready = True
 
 app = FastAPI(
     title="AI Assignment Code Pipeline - Production",
     description="Enterprise-grade code generation API with multi-language support, authentication, and notifications",
-    version="2.1.0"
+    version="2.1.0",
+    default_response_class=ORJSONResponse
 )
 
+@app.on_event("startup")
+def create_tables():
+    """Create missing database tables once per process"""
+    init_db()
+
+@app.on_event("startup")
+def create_data_dirs():
+    """Create data folders on startup instead of at import time"""
+    ensure_dirs()
+
+@app.on_event("startup")
+async def start_metrics_rollup():
+    """Start the periodic SystemMetrics rollup that /admin/stats reads from"""
+    if METRICS_ROLLUP_SECONDS > 0:
+        app.state.metrics_rollup = asyncio.create_task(run_metrics_rollup())
+
 app.include_router(admin_router)
 
 router = APIRouter()
@@ -75,6 +116,14 @@ class UserStats(BaseModel):
     class Config:
         from_attributes = True
 
+USER_STATS_COLUMNS = tuple(getattr(User, name) for name in UserStats.model_fields)
+
+class JobSummary(BaseModel):
+    job_id: str
+    status: str
+    created_at: datetime
+    completed_at: Optional[datetime] = None
+
 class PasswordChangeRequest(BaseModel):
     old_password: str
     new_password: str
@@ -86,77 +135,44 @@ async def change_password(
     db: Session = Depends(get_db)
 ):
     # Verify current password
-    if not verify_password(req.old_password, current_user.hashed_password):
+    if not await asyncio.to_thread(verify_password, req.old_password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Current password is incorrect"
         )
     # Set new password
-    current_user.hashed_password = get_password_hash(req.new_password)
+    current_user.hashed_password = await asyncio.to_thread(get_password_hash, req.new_password)
     db.add(current_user)
     db.commit()
     return {"success": True, "message": "Password changed successfully"}
 
 app.include_router(router)
 
-# Enhanced background task processor
-def process_assignment_job(job_id: str, input_path: str, user_id: int, language: str = "python"):
-    """Process assignment with enhanced language support"""
-    db = next(get_db())
-    job = db.query(Job).filter(Job.job_id == job_id).first()
-    
-    try:
-        job.status = "processing"
-        db.commit()
-        
-        start_time = datetime.utcnow()
-        
-        # Get language configuration
-        lang_config = get_language_config(language)
-        print(f"🚀 Processing {language} assignment using {lang_config.name}")
-        
-        # Run the actual job
-        result_file = run_batch_job(input_path, OUTPUT_DIR)
-        
-        end_time = datetime.utcnow()
-        processing_time = str(end_time - start_time)
-        
-        job.status = "done"
-        job.output_file_path = result_file
-        job.completed_at = end_time
-        job.processing_time_seconds = (end_time - start_time).total_seconds()
-        
-        # Update user stats
-        user = db.query(User).filter(User.id == user_id).first()
-        user.total_jobs += 1
-        db.commit()
-        
-        # Count questions (rough estimate)
-        questions_count = 1
-        try:
-            with open(input_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                questions_count = max(content.count('?'), content.count('\n\n'), 1)
-        except:
-            questions_count = 1
-        
-        # Send completion notification (FIXED - removed async)
-        print(f"✅ Job {job_id[:8]} completed successfully!")
-        print(f"📧 [NOTIFICATION] Assignment complete for {user.username}: Job {job_id[:8]} ({language}) completed in {processing_time}")
-        print(f"📊 Questions processed: {questions_count}")
-        
-    except Exception as e:
-        job.status = "error" 
-        job.error_message = str(e)
-        db.commit()
-        print(f"❌ Job {job_id[:8]} failed: {e}")
-    finally:
-        db.close()
+def _save_upload(src, dest_path: str, size: int = None):
+    """Copy an uploaded file object to disk (blocking, run off the event loop)"""
+    with open(dest_path, "wb") as f:
+        # Uploads above the spool threshold live in a real temp file, so the
+        # kernel can copy them directly without going through Python buffers
+        if size and size > UPLOAD_BUFSIZE and hasattr(os, "sendfile"):
+            try:
+                in_fd, out_fd = src.fileno(), f.fileno()
+                offset = 0
+                while offset < size:
+                    sent = os.sendfile(out_fd, in_fd, offset, size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+                return
+            except OSError:
+                # Fall back to a buffered copy from the start
+                src.seek(0)
+                f.seek(0)
+                f.truncate()
+        shutil.copyfileobj(src, f, UPLOAD_BUFSIZE)
 
 # ===== NEW LANGUAGE ENDPOINTS =====
-@app.get("/supported-languages", tags=["Languages"])
-async def get_languages():
-    """Get list of supported programming languages"""
+def _build_languages_payload():
+    """Build the static /supported-languages payload"""
     languages = []
     for lang_key in get_supported_languages():
         config = get_language_config(lang_key)
@@ -169,30 +185,51 @@ async def get_languages():
         })
     return {"languages": languages, "default": "python"}
 
+# Language configuration is static, so the payload is serialized once at import
+LANGUAGES_PAYLOAD = _build_languages_payload()
+LANGUAGES_BODY = orjson.dumps(LANGUAGES_PAYLOAD)
+
+@app.get("/supported-languages", tags=["Languages"])
+async def get_languages():
+    """Get list of supported programming languages"""
+    return Response(
+        content=LANGUAGES_BODY,
+        media_type="application/json",
+        headers={"Cache-Control": "public, max-age=3600"}
+    )
+
 # ===== AUTHENTICATION ENDPOINTS =====
 @app.post("/register", response_model=UserStats, tags=["Authentication"])
 @limiter.limit("5/hour")
-async def register(request: Request, user: UserCreate, db: Session = Depends(get_db)):
+async def register(
+    request: Request,
+    user: UserCreate,
+    db: Session = Depends(get_db)
+):
     """Register a new user with welcome email"""
-    # Check if user exists
-    if db.query(User).filter(User.username == user.username).first():
-        raise HTTPException(status_code=400, detail="Username already registered")
-    if db.query(User).filter(User.email == user.email).first():
+    # Create new user; the unique constraints reject duplicates
+    # (RETURNING avoids a refresh SELECT after commit)
+    hashed_password = await asyncio.to_thread(get_password_hash, user.password)
+    try:
+        db_user = db.execute(
+            insert(User).values(
+                username=user.username,
+                email=user.email,
+                hashed_password=hashed_password
+            ).returning(*USER_STATS_COLUMNS)
+        ).one()
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        existing = db.query(User.username).filter(
+            or_(User.username == user.username, User.email == user.email)
+        ).first()
+        if existing and existing.username == user.username:
+            raise HTTPException(status_code=400, detail="Username already registered")
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    # Create new user
-    db_user = User(
-        username=user.username,
-        email=user.email,
-        hashed_password=get_password_hash(user.password)
-    )
-    
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    
-    # Send welcome email (async)
-    asyncio.create_task(send_welcome_email(user.email, user.username))
+    # Send welcome email via the job queue
+    await asyncio.to_thread(enqueue, send_welcome_email_task, user.email, user.username)
     
     return db_user
 
@@ -204,8 +241,11 @@ async def login(
     db: Session = Depends(get_db)
 ):
     """Login and get access token"""
-    user = authenticate_user(db, form_data.username, form_data.password)
-    if not user:
+    # bcrypt verification is CPU-heavy, so run it off the event loop
+    user = get_user_by_username(db, form_data.username)
+    if not user or not await asyncio.to_thread(
+        verify_password, form_data.password, user.hashed_password
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -219,41 +259,65 @@ async def login(
     
     return {"access_token": access_token, "token_type": "bearer"}
 
+@lru_cache(maxsize=1)
+def _month_start(year: int, month: int) -> datetime:
+    """First instant of the given month (cached until the month changes)"""
+    return datetime(year, month, 1)
+
+def _job_counts(db: Session, user_id: int):
+    """Total, successful, failed and this-month job counts in a single query"""
+    now = datetime.utcnow()
+    first_day_of_month = _month_start(now.year, now.month)
+    return db.query(
+        func.count(Job.id),
+        func.count(case((Job.status == "done", 1))),
+        func.count(case((Job.status == "error", 1))),
+        func.count(case((Job.created_at >= first_day_of_month, 1)))
+    ).filter(Job.user_id == user_id).one()
+
+def _me_payload(user: User, counts) -> dict:
+    """User data with calculated job stats"""
+    total_jobs, _, _, jobs_this_month = counts
+    return {
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "total_jobs": total_jobs,
+        "total_jobs_this_month": jobs_this_month,
+        "total_tokens_used": user.total_tokens_used,
+        "total_spent": user.total_spent,
+        "created_at": user.created_at,
+        "is_active": user.is_active,
+        "is_admin": user.is_admin
+    }
+
+def _analytics_payload(user: User, counts) -> dict:
+    """Personal usage analytics from the job counts"""
+    total_jobs, successful_jobs, failed_jobs, jobs_this_month = counts
+    return {
+        "total_jobs": total_jobs,
+        "successful_jobs": successful_jobs,
+        "failed_jobs": failed_jobs,
+        "success_rate": round((successful_jobs / total_jobs * 100) if total_jobs > 0 else 0.0, 2),
+        "total_tokens_used": user.total_tokens_used,
+        "total_spent": user.total_spent,
+        "jobs_this_month": jobs_this_month
+    }
+
 @app.get("/me", tags=["Users"])
 async def read_users_me(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Get current user info with accurate job count"""
-    # Calculate actual job count from database
-    total_jobs = db.query(Job).filter(Job.user_id == current_user.id).count()
-    
-    # Calculate jobs this month
-    from datetime import datetime, timedelta
-    first_day_of_month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    jobs_this_month = db.query(Job).filter(
-        Job.user_id == current_user.id,
-        Job.created_at >= first_day_of_month
-    ).count()
-    
-    # Update user stats in database
-    current_user.total_jobs = total_jobs
-    current_user.total_jobs_this_month = jobs_this_month
-    db.commit()
+    cache_key = me_key(current_user.id)
+    cached = await get_cached(cache_key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
     
-    # Return user data with calculated stats
-    return {
-        "id": current_user.id,
-        "username": current_user.username,
-        "email": current_user.email,
-        "total_jobs": total_jobs,
-        "total_jobs_this_month": jobs_this_month,
-        "total_tokens_used": current_user.total_tokens_used,
-        "total_spent": current_user.total_spent,
-        "created_at": current_user.created_at,
-        "is_active": current_user.is_active,
-        "is_admin": current_user.is_admin
-    }
+    body = orjson.dumps(_me_payload(current_user, _job_counts(db, current_user.id)))
+    await set_cached(cache_key, body)
+    return Response(content=body, media_type="application/json")
 
 
 # ===== ENHANCED JOB ENDPOINTS =====
@@ -263,7 +327,6 @@ async def submit_assignment(
     request: Request,
     file: UploadFile = File(...),
     language: str = Form("python"),
-    background_tasks: BackgroundTasks = None,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -272,33 +335,31 @@ async def submit_assignment(
         raise HTTPException(status_code=400, detail="Only .txt files are accepted.")
     
     # Validate language
-    if language not in get_supported_languages():
+    if language not in SUPPORTED_LANGUAGES:
         raise HTTPException(status_code=400, detail=f"Unsupported language. Supported: {', '.join(get_supported_languages())}")
     
     # Create job ID and save file
-    job_id = str(uuid.uuid4())
-    input_path = os.path.join(INPUT_DIR, f"{job_id}.txt")
+    job_id = new_job_id()
+    input_path = f"{INPUT_PATH_PREFIX}{job_id}.txt"
     
-    with open(input_path, "wb") as f:
-        shutil.copyfileobj(file.file, f)
+    await asyncio.to_thread(_save_upload, file.file, input_path, file.size)
     
     # Create job record in database
-    db_job = Job(
-        job_id=job_id,
-        user_id=current_user.id,
-        input_file_path=input_path,
-        status="queued"
+    db.execute(
+        insert(Job).values(
+            job_id=job_id,
+            user_id=current_user.id,
+            input_file_path=input_path,
+            status="queued"
+        )
     )
-    
-    db.add(db_job)
-    
-    # 💰 NEW: Increment user's monthly usage
-    current_user.total_jobs_this_month += 1
     db.commit()
+    await invalidate_user_async(current_user.id)
     
-    # Start enhanced background processing
-    if background_tasks:
-        background_tasks.add_task(process_assignment_job, job_id, input_path, current_user.id, language)
+    # Hand off to the job queue (falls back to the local job pool)
+    await asyncio.to_thread(
+        enqueue, process_assignment_job, job_id, input_path, current_user.id, language, OUTPUT_DIR
+    )
     
     return {
         "job_id": job_id, 
@@ -307,14 +368,24 @@ async def submit_assignment(
         "message": f"Assignment queued for {get_language_config(language).name} processing"
     }
 
+def _get_own_job(db: Session, job_id: uuid.UUID, user_id: int, *columns):
+    """Fetch only the given columns of a job owned by the user (None if missing)"""
+    return db.execute(
+        select(*columns).where(Job.job_id == str(job_id), Job.user_id == user_id)
+    ).first()
+
 @app.get("/status/{job_id}", tags=["Jobs"])
-async def get_status(
-    job_id: str,
+def get_status(
+    job_id: uuid.UUID,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Get job status (user can only see their own jobs)"""
-    job = db.query(Job).filter(Job.job_id == job_id, Job.user_id == current_user.id).first()
+    job = _get_own_job(
+        db, job_id, current_user.id,
+        Job.job_id, Job.status, Job.created_at, Job.completed_at,
+        Job.processing_time_seconds, Job.error_message
+    )
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
@@ -329,40 +400,69 @@ async def get_status(
 
 @app.get("/download/{job_id}", tags=["Jobs"])
 async def download_docx(
-    job_id: str,
+    job_id: uuid.UUID,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """Download assignment result (user can only download their own jobs)"""
-    job = db.query(Job).filter(Job.job_id == job_id, Job.user_id == current_user.id).first()
+    job = _get_own_job(db, job_id, current_user.id, Job.status, Job.output_file_path)
     
     if not job or job.status != "done" or not job.output_file_path:
         raise HTTPException(status_code=404, detail="Result not ready or failed")
     
+    try:
+        stat_result = os.stat(job.output_file_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Result file not found")
+    
+    filename = os.path.basename(job.output_file_path)
+    headers = {"Cache-Control": "private, max-age=300"}
+    
+    if DOWNLOAD_ACCEL_PREFIX:
+        # Behind nginx: let it serve the file via sendfile, no body from the worker
+        headers["X-Accel-Redirect"] = f"{DOWNLOAD_ACCEL_PREFIX.rstrip('/')}/{quote(filename)}"
+        headers["Content-Disposition"] = f"attachment; filename*=utf-8''{quote(filename)}"
+        return Response(headers=headers, media_type=DOCX_MEDIA_TYPE)
+    
     return FileResponse(
         job.output_file_path,
-        filename=os.path.basename(job.output_file_path),
-        media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+        filename=filename,
+        media_type=DOCX_MEDIA_TYPE,
+        stat_result=stat_result,
+        headers=headers
     )
 
-@app.get("/my-jobs", tags=["Jobs"]) 
-async def list_my_jobs(
+def _recent_jobs(db: Session, user_id: int, limit: int, offset: int):
+    """Job summary rows for a user, newest first"""
+    return db.execute(
+        select(Job.job_id, Job.status, Job.created_at, Job.completed_at)
+        .where(Job.user_id == user_id)
+        .order_by(Job.created_at.desc())
+        .limit(limit)
+        .offset(offset)
+    ).mappings().all()
+
+@app.get("/my-jobs", response_model=List[JobSummary], tags=["Jobs"]) 
+def list_my_jobs(
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """List all jobs for current user"""
-    jobs = db.query(Job).filter(Job.user_id == current_user.id).order_by(Job.created_at.desc()).all()
-    return jobs
+    """List jobs for current user, newest first"""
+    return _recent_jobs(db, current_user.id, limit, offset)
+
+HEALTH_BODY = orjson.dumps({
+    "status": "ok",
+    "version": "2.1.0",
+    "features": ["multi-language", "email-notifications", "enhanced-analytics"],
+    "supported_languages": get_supported_languages()
+})
 
 @app.get("/", tags=["Health"])
 async def health():
     """Health check endpoint"""
-    return {
-        "status": "ok", 
-        "version": "2.1.0",
-        "features": ["multi-language", "email-notifications", "enhanced-analytics"],
-        "supported_languages": get_supported_languages()
-    }
+    return Response(content=HEALTH_BODY, media_type="application/json")
 
 @app.get("/analytics/usage", tags=["Analytics"])
 async def get_usage_analytics(
@@ -370,19 +470,28 @@ async def get_usage_analytics(
     db: Session = Depends(get_db)
 ):
     """Get personal usage analytics"""
-    jobs = db.query(Job).filter(Job.user_id == current_user.id).all()
+    cache_key = analytics_key(current_user.id)
+    cached = await get_cached(cache_key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
     
-    total_jobs = len(jobs)
-    successful_jobs = len([j for j in jobs if j.status == "done"])
-    failed_jobs = len([j for j in jobs if j.status == "error"])
-    
-    return {
-        "total_jobs": total_jobs,
-        "successful_jobs": successful_jobs,
-        "failed_jobs": failed_jobs,
-        "success_rate": round((successful_jobs / total_jobs * 100) if total_jobs > 0 else 0.0, 2),
-        "total_tokens_used": current_user.total_tokens_used,
-        "total_spent": current_user.total_spent,
-        "jobs_this_month": current_user.total_jobs_this_month
-    }
+    body = orjson.dumps(_analytics_payload(current_user, _job_counts(db, current_user.id)))
+    await set_cached(cache_key, body)
+    return Response(content=body, media_type="application/json")
 
+@app.get("/dashboard", tags=["Users"])
+def get_dashboard(
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """User info, recent jobs, analytics (and admin lists) in one response"""
+    counts = _job_counts(db, current_user.id)
+    bundle = {
+        "user": _me_payload(current_user, counts),
+        "jobs": [dict(row) for row in _recent_jobs(db, current_user.id, limit, 0)],
+        "analytics": _analytics_payload(current_user, counts)
+    }
+    if current_user.is_admin:
+        bundle["admin"] = admin_overview(db)
+    return Response(content=orjson.dumps(bundle), media_type="application/json")
@@ -1,6 +1,11 @@
 import streamlit as st
+from streamlit_autorefresh import st_autorefresh
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import io
 import json
+import orjson
 import time
 from datetime import datetime
 import pandas as pd
@@ -14,6 +19,32 @@ st.set_page_config(
 )
 
 API_BASE_URL = "http://localhost:8000"  # Update for production
+PREVIEW_BYTES = 4096  # Upload preview size
+JOBS_POLL_INTERVAL_MS = 5000  # Auto-refresh while jobs are queued/processing
+ACTIVE_JOB_STATUSES = frozenset({"queued", "processing"})
+
+# Static help text, built once per process
+DOCS_MD = f"""
+    ### Getting Started
+    - **Register/Login**: Create your account if you're a new user.
+    - **Submit Assignment**: Upload a `.txt` file with each question on a new line.
+    - **Track Jobs**: Use the 'My Jobs' tab to see progress and download results.
+
+    ### Assignment Format Example
+
+    ```
+    Q1. Write a function to sum numbers in Python.
+    Q2. Implement a class for Rectangle in C++.
+    ```
+
+    ### Troubleshooting
+    - If you forget your password, contact support.
+    - If uploads fail, confirm your file format.
+
+    ### API
+    - [Swagger/OpenAPI Docs]({API_BASE_URL}/docs)
+"""
+LOGIN_FOOTER = "Forgot password? Contact support@example.com for help."
 
 # Session state
 if 'token' not in st.session_state:
@@ -21,6 +52,35 @@ if 'token' not in st.session_state:
 if 'user' not in st.session_state:
     st.session_state.user = None
 
+@st.cache_resource
+def get_http_session():
+    """Shared keep-alive HTTP session to the API (reused across reruns)"""
+    session = requests.Session()
+    # Retry connection errors on idempotent GETs only; POSTs are never replayed
+    retries = Retry(total=3, backoff_factor=0.2, allowed_methods=frozenset({"GET"}))
+    adapter = HTTPAdapter(pool_connections=20, pool_maxsize=20, max_retries=retries)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@st.cache_data(ttl=30, show_spinner=False)
+def cached_get(endpoint, token):
+    """Read-only GET cached per endpoint and token; errors raise so they are not cached"""
+    response = get_http_session().get(
+        f"{API_BASE_URL}{endpoint}",
+        headers={'Authorization': f"Bearer {token}"}
+    )
+    response.raise_for_status()
+    return orjson.loads(response.content)
+
+def api_get_cached(endpoint):
+    try:
+        return cached_get(endpoint, st.session_state.token)
+    except requests.HTTPError as e:
+        return {"error": e.response.text}
+    except Exception as e:
+        return {"error": str(e)}
+
 def api_call(endpoint, method="GET", data=None, files=None, auth=True):
     headers = {}
     if auth and st.session_state.token:
@@ -29,13 +89,15 @@ def api_call(endpoint, method="GET", data=None, files=None, auth=True):
     try:
         if method == "POST":
             if files:
-                response = requests.post(url, headers=headers, files=files, data=data)
+                response = get_http_session().post(url, headers=headers, files=files, data=data)
             else:
                 headers['Content-Type'] = 'application/json'
-                response = requests.post(url, headers=headers, json=data)
+                response = get_http_session().post(url, headers=headers, data=orjson.dumps(data))
+            # Writes may change anything shown on the dashboard
+            cached_get.clear()
         else:
-            response = requests.get(url, headers=headers)
-        return response.json() if response.status_code == 200 else {"error": response.text}
+            response = get_http_session().get(url, headers=headers)
+        return orjson.loads(response.content) if response.status_code == 200 else {"error": response.text}
     except Exception as e:
         return {"error": str(e)}
 
@@ -49,7 +111,7 @@ def login_page():
             submit = st.form_submit_button("Login", use_container_width=True)
         if submit:
             with st.spinner("Logging in..."):
-                response = requests.post(
+                response = get_http_session().post(
                     f"{API_BASE_URL}/token",
                     data={"username": username, "password": password}
                 )
@@ -94,7 +156,7 @@ def login_page():
                     st.success("✅ Account created! Please login.")
                 else:
                     st.error(f"❌ Registration failed: {result['error']}")
-    st.info("Forgot password? Contact support@example.com for help.")
+    st.info(LOGIN_FOOTER)
 
 def job_status_color(status):
     if status == 'done':
@@ -108,51 +170,67 @@ def job_status_color(status):
 
 def show_jobs(jobs):
     st.subheader("📊 My Jobs")
-    for job in jobs:
-        col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
-        with col1:
-            st.markdown(f"{job_status_color(job['status'])} **Job {job['job_id'][:8]}**")
-            st.caption(f"Created: {job['created_at']}")
-        with col2:
-            st.markdown(f"**Status:** {job['status'].title()}")
-            st.caption(f"{job.get('language','-').title()}")
-        with col3:
-            if job['status'] == 'done':
-                if st.button(f"📥 Download", key=f"download_{job['job_id']}"):
-                    response = requests.get(
-                        f"{API_BASE_URL}/download/{job['job_id']}",
-                        headers={'Authorization': f"Bearer {st.session_state.token}"}
-                    )
-                    if response.status_code == 200:
-                        st.download_button(
-                            label="💾 Save Document",
-                            data=response.content,
-                            file_name=f"assignment_{job['job_id'][:8]}.docx",
-                            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                        )
-                        st.success("File download ready!")
-                    else:
-                        st.error("Error downloading file.")
+    if st.button("🔄 Refresh all", key="refresh_jobs"):
+        cached_get.clear()
+        st.rerun()
+    
+    # One table for all jobs; widgets are only built for the selected row
+    df = pd.DataFrame(jobs)
+    df.insert(0, " ", df["status"].map(job_status_color))
+    columns = [c for c in [" ", "job_id", "status", "language", "created_at", "completed_at"] if c in df]
+    selection = st.dataframe(
+        df[columns],
+        key="jobs_table",
+        hide_index=True,
+        use_container_width=True,
+        on_select="rerun",
+        selection_mode="single-row",
+    )
+    rows = selection.selection.rows
+    if not rows:
+        st.caption("Select a job to download its result or see details.")
+        return
+    job = jobs[rows[0]]
+    
+    if job['status'] == 'done':
+        if st.button(f"📥 Download", key=f"download_{job['job_id']}"):
+            # Pull the document in chunks so the connection goes back to the pool
+            document = io.BytesIO()
+            with get_http_session().get(
+                f"{API_BASE_URL}/download/{job['job_id']}",
+                headers={'Authorization': f"Bearer {st.session_state.token}"},
+                stream=True
+            ) as response:
+                if response.status_code == 200:
+                    for chunk in response.iter_content(64 * 1024):
+                        document.write(chunk)
+                    document.seek(0)
+            if response.status_code == 200:
+                st.download_button(
+                    label="💾 Save Document",
+                    data=document,
+                    file_name=f"assignment_{job['job_id'][:8]}.docx",
+                    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+                )
+                st.success("File download ready!")
             else:
-                st.button("📥 Download", key=f"download_disabled_{job['job_id']}", disabled=True, help="Job not ready yet.")
-        with col4:
-            if st.button("🔄 Refresh", key=f"refresh_{job['job_id']}"):
-                st.rerun()
-        with st.expander("Show job details", expanded=False):
-            st.markdown(f"**Job ID:** `{job['job_id']}`")
-            st.markdown(f"**Created:** {job['created_at']}")
-            st.markdown(f"**Language:** {job.get('language','-')}")
-            st.markdown(f"**Status:** {job['status']}")
-            if job.get("output"):
-                st.markdown("**Output:**")
-                st.code(job['output'])
-            if job.get("error"):
-                st.markdown("**Error:**")
-                st.error(job['error'])
-            if job.get("code"):
-                st.markdown("**Generated code:**")
-                st.code(job['code'])
-        st.divider()
+                st.error("Error downloading file.")
+    else:
+        st.button("📥 Download", key=f"download_disabled_{job['job_id']}", disabled=True, help="Job not ready yet.")
+    with st.expander("Show job details", expanded=False):
+        st.markdown(f"**Job ID:** `{job['job_id']}`")
+        st.markdown(f"**Created:** {job['created_at']}")
+        st.markdown(f"**Language:** {job.get('language','-')}")
+        st.markdown(f"**Status:** {job['status']}")
+        if job.get("output"):
+            st.markdown("**Output:**")
+            st.code(job['output'])
+        if job.get("error"):
+            st.markdown("**Error:**")
+            st.error(job['error'])
+        if job.get("code"):
+            st.markdown("**Generated code:**")
+            st.code(job['code'])
 
 def assignment_upload_section():
     st.subheader("Upload Assignment File")
@@ -161,21 +239,24 @@ def assignment_upload_section():
         uploaded_file = st.file_uploader("Choose a .txt file", type=['txt'])
         if uploaded_file:
             st.info(f"**File:** {uploaded_file.name} ({uploaded_file.size/1024:.1f} KB)")
-            st.text_area("File preview:", uploaded_file.getvalue().decode(), height=200)
+            # Preview only the head of the file; the upload streams from the handle
+            preview = uploaded_file.read(PREVIEW_BYTES).decode(errors="replace")
+            uploaded_file.seek(0)
+            st.text_area("File preview:", preview, height=200)
         submit_file = st.form_submit_button("🚀 Submit Assignment")
         if submit_file and uploaded_file:
             with st.spinner("Uploading and processing..."):
-                files = {'file': uploaded_file}
+                uploaded_file.seek(0)
+                files = {'file': (uploaded_file.name, uploaded_file, 'text/plain')}
                 result = api_call("/submit-assignment", "POST", files=files)
             if 'error' not in result:
                 st.success(f"✅ Assignment submitted! Job ID: {result['job_id']}")
             else:
                 st.error(f"❌ Upload failed: {result['error']}")
 
-def analytics_dashboard():
+def analytics_dashboard(analytics):
     st.subheader("📈 Your Analytics")
-    analytics = api_call("/analytics/usage")
-    if 'error' not in analytics:
+    if analytics and 'error' not in analytics:
         col1, col2, col3, col4 = st.columns(4)
         col1.metric("Total Jobs", analytics.get('total_jobs', 0))
         col2.metric("Success Rate", f"{analytics.get('success_rate',0)}%")
@@ -190,9 +271,8 @@ def analytics_dashboard():
     else:
         st.info("No analytics available yet.")
 
-def profile_tab():
+def profile_tab(user):
     st.subheader("👤 Profile / Account Info")
-    user = api_call("/me")
     if user and 'error' not in user:
         st.markdown(f"**Username:** {user['username']}")
         st.markdown(f"**Email:** {user['email']}")
@@ -223,30 +303,12 @@ def profile_tab():
 
 def docs_tab():
     st.subheader("📖 Documentation / Help")
-    st.markdown("""
-    ### Getting Started
-    - **Register/Login**: Create your account if you're a new user.
-    - **Submit Assignment**: Upload a `.txt` file with each question on a new line.
-    - **Track Jobs**: Use the 'My Jobs' tab to see progress and download results.
-
-    ### Assignment Format Example
-
-    ```
-    Q1. Write a function to sum numbers in Python.
-    Q2. Implement a class for Rectangle in C++.
-    ```
-
-    ### Troubleshooting
-    - If you forget your password, contact support.
-    - If uploads fail, confirm your file format.
-
-    ### API
-    - [Swagger/OpenAPI Docs](http://localhost:8000/docs)
-    """)
+    st.markdown(DOCS_MD)
 
-def admin_tab():
+def admin_tab(admin):
     st.subheader("🛡️ Admin Dashboard")
-    users = api_call("/admin/users")
+    admin = admin or {}
+    users = admin.get("users")
     if users and isinstance(users, list):
         st.markdown("**All Users:**")
         for u in users:
@@ -265,7 +327,7 @@ def admin_tab():
                     st.rerun()
     else:
         st.warning("No user data or unauthorized.")
-    jobs = api_call("/admin/jobs")
+    jobs = admin.get("jobs")
     if jobs and isinstance(jobs, list):
         st.markdown("**All Jobs:**")
         for job in jobs:
@@ -276,8 +338,20 @@ def admin_tab():
         st.warning("No job data or unauthorized.")
 
 def main_dashboard():
+    # Poll only while a job is still running; each tick refetches fresh data
+    if st.session_state.get("jobs_in_flight"):
+        tick = st_autorefresh(interval=JOBS_POLL_INTERVAL_MS, key="jobs_poll")
+        if tick != st.session_state.get("jobs_poll_tick"):
+            st.session_state.jobs_poll_tick = tick
+            cached_get.clear()
+    
+    # User info, jobs and analytics arrive in a single request
+    dashboard = api_get_cached("/dashboard")
+    user_data = dashboard.get("user") or dashboard
+    st.session_state.jobs_in_flight = any(
+        j.get("status") in ACTIVE_JOB_STATUSES for j in dashboard.get("jobs") or []
+    )
     with st.sidebar:
-        user_data = api_call("/me")
         if 'error' not in user_data:
             st.session_state.user = user_data
             username = user_data.get('username', 'User')
@@ -293,6 +367,7 @@ def main_dashboard():
         if st.button("🚪 Logout", use_container_width=True):
             st.session_state.token = None
             st.session_state.user = None
+            cached_get.clear()
             st.rerun()
 
     admin_tab_index = 5 if st.session_state.user.get("is_admin", False) else None
@@ -310,20 +385,20 @@ def main_dashboard():
     with st_tabs[0]:
         assignment_upload_section()
     with st_tabs[1]:
-        jobs = api_call("/my-jobs")
+        jobs = dashboard.get("jobs")
         if jobs and isinstance(jobs, list):
             show_jobs(jobs)
         else:
             st.info("No jobs yet. Upload an assignment to get started!")
     with st_tabs[2]:
-        analytics_dashboard()
+        analytics_dashboard(dashboard.get("analytics"))
     with st_tabs[3]:
-        profile_tab()
+        profile_tab(dashboard.get("user"))
     with st_tabs[4]:
         docs_tab()
     if admin_tab_index:
         with st_tabs[5]:
-            admin_tab()
+            admin_tab(dashboard.get("admin"))
 
 def main():
     if st.session_state.token:
@@ -3,6 +3,8 @@ LangGraph Workflow Definition
 This is the agent's decision-making graph
 """
 
+import threading
+from functools import cached_property
 from typing import Literal
 from langgraph.graph import StateGraph, END
 from src.agent.state import CodeAgentState
@@ -15,11 +17,17 @@ logger = get_logger(__name__)
 class CodeGenerationGraph:
     """LangGraph workflow for code generation agent"""
     
-    def __init__(self):
-        """Initialize the graph with nodes"""
-        self.nodes = AgentNodes()
-        self.graph = self._build_graph()
+    @cached_property
+    def nodes(self) -> AgentNodes:
+        """Node functions (created on first use; builds the LLM client)"""
+        return AgentNodes()
+    
+    @cached_property
+    def graph(self) -> StateGraph:
+        """State graph, built on first access (e.g. by compile())"""
+        graph = self._build_graph()
         logger.info("LangGraph workflow initialized")
+        return graph
     
     def _build_graph(self) -> StateGraph:
         """Build the state graph with nodes and edges"""
@@ -42,9 +50,17 @@ class CodeGenerationGraph:
                 logger.warning("Max iterations reached in review loop, forcing pass")
                 return "pass"
             
-            # Check for PASS in feedback
-            feedback = state.get("review_feedback", "")
-            if "PASS" in feedback.upper():  # Case-insensitive check
+            # Same code reviewed with the same feedback twice: retrying won't help
+            if state.get("review_stuck"):
+                logger.warning("Stuck review loop (identical code and feedback), forcing pass")
+                return "pass"
+            
+            # Reviewer already rewrote the code: review the new version without regenerating
+            if state.get("review_revised"):
+                return "revised"
+            
+            # Reviewer answered PASS (case-insensitive)
+            if state.get("review_passed"):
                 return "pass"
             return "retry"
 
@@ -55,6 +71,7 @@ class CodeGenerationGraph:
             review_outcome,
             {
                 "retry": "generate_code",
+                "revised": "review_code",
                 "pass": "execute_code"
             }
         )
@@ -90,7 +107,22 @@ class CodeGenerationGraph:
         if state["iteration_count"] >= state["max_iterations"]:
             logger.warning("Max iterations reached", ...)
             return "complete"
+        if state.get("validation_stuck"):
+            logger.warning("Stuck validation loop (identical code and errors), completing")
+            return "complete"
         logger.info("Validation failed - retrying", language=state.get("target_language"), iteration=state.get("iteration_count"))
         return "retry"
 
 
+# Compiled graph singleton (the graph is stateless between runs)
+_compiled_graph = None
+_compiled_graph_lock = threading.Lock()
+
+def get_compiled_graph():
+    """Get the compiled workflow, building it on first use"""
+    global _compiled_graph
+    if _compiled_graph is None:
+        with _compiled_graph_lock:
+            if _compiled_graph is None:
+                _compiled_graph = CodeGenerationGraph().compile()
+    return _compiled_graph
@@ -3,7 +3,9 @@ Input File Parser
 Reads .txt files and extracts problem description + target language
 """
 
+import os
 import re
+from functools import lru_cache
 from pathlib import Path
 from typing import Tuple
 from src.utils.logger import get_logger
@@ -21,6 +23,9 @@ class InputParser:
         r"write\s+in\s+(\w+)",
         r"code\s+in\s+(\w+)",
     ]
+    _COMPILED_PATTERNS = [re.compile(p, re.IGNORECASE) for p in LANGUAGE_PATTERNS]
+    
+    PROBLEM_HEADERS = frozenset({"problem:", "problem", "task:", "task"})
     
     SUPPORTED_LANGUAGES = {
         "python": "python",
@@ -64,13 +69,23 @@ class InputParser:
             FileNotFoundError: If file doesn't exist
             ValueError: If language not specified or unsupported
         """
-        path = Path(file_path)
-        
-        if not path.exists():
+        # Key the parse cache on path + size + mtime so edits invalidate it
+        try:
+            st = os.stat(file_path)
+        except FileNotFoundError:
             raise FileNotFoundError(f"Input file not found: {file_path}")
         
+        return cls._parse_cached(os.path.abspath(file_path), st.st_size, st.st_mtime_ns)
+    
+    @classmethod
+    @lru_cache(maxsize=256)
+    def _parse_cached(cls, file_path: str, size: int, mtime_ns: int) -> Tuple[str, str]:
+        """Parse a file version identified by (path, size, mtime_ns)"""
         # Read file content
-        content = path.read_text(encoding="utf-8").strip()
+        try:
+            content = Path(file_path).read_text(encoding="utf-8").strip()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Input file not found: {file_path}")
         
         if not content:
             raise ValueError("Input file is empty")
@@ -105,13 +120,13 @@ class InputParser:
         """Extract programming language from content"""
         
         # Try all patterns
-        for pattern in cls.LANGUAGE_PATTERNS:
-            match = re.search(pattern, content, re.IGNORECASE)
+        for pattern in cls._COMPILED_PATTERNS:
+            match = pattern.search(content)
             if match:
                 return match.group(1)
         
         # Try first line as language
-        first_line = content.split("\n")[0].strip()
+        first_line = content.partition("\n")[0].strip()
         if first_line.lower() in cls.SUPPORTED_LANGUAGES:
             return first_line
         
@@ -125,18 +140,18 @@ class InputParser:
         """Extract problem description by removing language declaration"""
         
         # Remove language line
-        lines = content.split("\n")
+        lang_lower = language.lower()
         problem_lines = []
         
         language_found = False
-        for line in lines:
-            # Skip language declaration line
-            if not language_found and language.lower() in line.lower():
+        for line in content.split("\n"):
+            # Skip language declaration line (only the first match)
+            if not language_found and lang_lower in line.lower():
                 language_found = True
                 continue
             
             # Skip "Problem:" header
-            if line.strip().lower() in ["problem:", "problem", "task:", "task"]:
+            if line.strip().lower() in cls.PROBLEM_HEADERS:
                 continue
             
             problem_lines.append(line)
@@ -202,7 +217,6 @@ def parse_multi_question_file_with_meta(path):
                         if sep in line:
                             lang = line.split(sep, 1)[1].strip()
                             break
-            print(f"DEBUG: Question {number} parsed language: {lang}")
             questions.append({
                 "number": number,
                 "question": "\n".join(q_text).strip(),
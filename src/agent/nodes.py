@@ -3,35 +3,252 @@ LangGraph Node Functions
 Each node is a discrete step in the agent workflow
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
+import asyncio
+import hashlib
+import re
+import threading
 import time
+import weakref
+from functools import cached_property, lru_cache
 from langchain_groq import ChatGroq
 from src.agent.state import CodeAgentState
 from src.utils.logger import get_logger
 from src.utils.config import get_settings
+from src.utils.backpressure import get_llm_limiter
+from src.utils.llm_cache import SqliteLLMCache, get_llm_cache
 from src.utils.docgen import generate_assignment_docx
 
 logger = get_logger(__name__)
 settings = get_settings()
 
+# Low temperature for consistent code generation (also part of the solution cache key)
+GENERATION_TEMPERATURE = 0.2
+
+
+# First fenced code block (``` or ~~~, optional language tag)
+_FENCE_RE = re.compile(r"(?:```|~~~)[a-zA-Z+#]*[ \t]*\n(.*?)\n[ \t]*(?:```|~~~)", re.DOTALL)
+
+
+@lru_cache(maxsize=16)
+def _prompt_head(language: str) -> str:
+    """Static, per-language start of the generation prompt"""
+    return f"""You are an expert {language.upper()} programmer. Generate clean, production-ready code.
+
+PROGRAMMING LANGUAGE: {language.upper()}
+
+REQUIREMENTS:
+1. Write complete, runnable code
+2. Include all necessary imports
+3. Add clear comments explaining the logic
+4. Handle edge cases and errors
+5. Follow {language} best practices and style guidelines
+6. Make the code efficient and readable
+
+"""
+
+
+@lru_cache(maxsize=16)
+def _prompt_tail(language: str) -> str:
+    """Static, per-language output rules closing the generation prompt"""
+    return f"""
+CRITICAL OUTPUT RULES:
+1. DO NOT include markdown code blocks (no ```)
+2. DO NOT include language tags like ```
+3. DO NOT add any explanations before or after the code
+4. START IMMEDIATELY with the first line of actual {language} code
+5. END with the last line of actual {language} code
+
+Your response MUST start with actual {language} code, not with ```:
+"""
+
+
+# Substrings that mark a validator tool's output as a finding, per language.
+# Lowercase tokens match case-insensitively; any other token matches as written.
+_WARN_TOKS = {
+    "python": ("Error", "warning", "issue"),
+    "javascript": ("error", "problem", "warning"),
+    "java": ("error", "exception"),
+    "c": ("error", "failed", "warning"),
+    "cpp": ("error", "failed", "warning"),
+    "go": ("error", "fail", "warning"),
+}
+
+# Reports a tool prints when it found nothing, even though they contain a token above
+_CLEAN_REPORTS = {
+    "bandit": "No issues identified.",
+}
+
+
+def _tool_errors(details: Dict[str, str], tools: Tuple[str, ...], tokens: Tuple[str, ...]) -> list:
+    """Collect '<tool>: <first 200 chars>' for every tool whose output reports a finding"""
+    errors = []
+    for tool in tools:
+        out = details.get(tool, "")
+        if not out or (tool in _CLEAN_REPORTS and _CLEAN_REPORTS[tool] in out):
+            continue
+        low = out.lower()
+        if any(tok in (low if tok.islower() else out) for tok in tokens):
+            errors.append(f"{tool}: {out.strip()[:200]}")  # first 200 chars for brevity
+    return errors
+
+
+@lru_cache(maxsize=256)
+def _generation_prompt(language: str, problem: str, feedback: str, review_feedback: str = "") -> str:
+    """Full generation prompt, memoized so repeated inputs reuse one string"""
+    parts = [_prompt_head(language), f"PROBLEM:\n{problem}\n\n"]
+    
+    # Add feedback from previous iterations if any
+    if feedback:
+        parts.append(f"""
+PREVIOUS ATTEMPT FAILED. FEEDBACK:
+{feedback}
+
+IMPORTANT: Fix the issues mentioned above and generate improved code.
+
+""")
+    
+    parts.append(_prompt_tail(language))
+    if review_feedback:
+        parts.append(f"\nCode Review Feedback: {review_feedback}\nPlease fix ALL the issues and try again.\n")
+    return "".join(parts)
+
+
+class _LeaderCancelled(Exception):
+    """Set on a shared in-flight LLM future when the call issuing it was cancelled"""
+
+
+def _loop_hash(code: str, feedback: str) -> str:
+    """Fingerprint of a (code, feedback) round, used to detect stuck retry loops"""
+    return hashlib.sha1(f"{code}\0{feedback}".encode("utf-8")).hexdigest()
+
 
 class AgentNodes:
     """Collection of node functions for the LangGraph workflow"""
     
     def __init__(self):
-        """Initialize with LLM client"""
-        self.llm = ChatGroq(
-            api_key=settings.groq_api_key,
-            model=settings.groq_model,
-            temperature=0.2,  # Low temperature for consistent code generation
-            max_tokens=4096,
-        )
+        """Initialize; LLM clients are created per event loop on first use"""
+        # Each batch job runs in its own event loop (asyncio.run), sometimes several
+        # at once, and an async client's connection pool is bound to the loop that
+        # first used it. Entries go away with their loop.
+        self._llms = weakref.WeakKeyDictionary()  # loop -> (generator, reviewer)
+        self._llms_lock = threading.Lock()
+        self._inflight: Dict[Tuple[asyncio.AbstractEventLoop, str], asyncio.Future] = {}
+        # Settings read on every node call, resolved once
+        self._model = settings.groq_model
+        self._timeout = settings.code_timeout_seconds
         logger.info(
             "Agent nodes initialized",
+            model=self._model,
+        )
+    
+    @staticmethod
+    def _new_llm() -> ChatGroq:
+        """Groq chat client with the agent's generation settings"""
+        return ChatGroq(
+            api_key=settings.groq_api_key,
             model=settings.groq_model,
+            temperature=GENERATION_TEMPERATURE,
+            max_tokens=4096,  # Room for corrected code alongside the review
         )
     
-    def generate_code_node(self, state: CodeAgentState) -> Dict[str, Any]:
+    def _loop_llms(self) -> Tuple[ChatGroq, ChatGroq]:
+        """(generator, reviewer) clients for the running event loop"""
+        loop = asyncio.get_running_loop()
+        llms = self._llms.get(loop)
+        if llms is None:
+            with self._llms_lock:
+                llms = self._llms.get(loop)
+                if llms is None:
+                    llms = self._llms[loop] = (self._new_llm(), self._new_llm())
+        return llms
+    
+    @property
+    def llm(self) -> ChatGroq:
+        """Code generation client for the running event loop"""
+        return self._loop_llms()[0]
+    
+    @property
+    def reviewer_llm(self) -> ChatGroq:
+        """Review client for the running event loop"""
+        return self._loop_llms()[1]
+    
+    @cached_property
+    def executor(self):
+        """Docker executor, created on first use so a missing Docker only fails execution"""
+        from src.execution.executor import CodeExecutor
+        return CodeExecutor()
+    
+    async def _invoke_cached(self, llm: ChatGroq, prompt: str) -> Tuple[str, int]:
+        """
+        Call the LLM through the response cache, in-flight dedup and backpressure limiter
+        
+        Returns:
+            (response_text, tokens_used); cache hits and coalesced calls report 0 new tokens
+        """
+        key = SqliteLLMCache.make_key(llm.model_name, llm.temperature, prompt)
+        cache = get_llm_cache()
+        if cache is not None:
+            hit = cache.get(key)
+            if hit is not None:
+                logger.info("LLM cache hit", key=key[:12])
+                return hit[0], 0
+        
+        # Single-flight: identical concurrent prompts share one provider call.
+        # Futures belong to one event loop, so the loop is part of the key.
+        loop = asyncio.get_running_loop()
+        flight_key = (loop, key)
+        pending = self._inflight.get(flight_key)
+        if pending is not None:
+            logger.info("Joining in-flight LLM call", key=key[:12])
+            try:
+                response_text, _ = await asyncio.shield(pending)
+            except _LeaderCancelled:
+                # The caller making the request went away; issue (or join) a fresh one
+                return await self._invoke_cached(llm, prompt)
+            return response_text, 0
+        
+        future = loop.create_future()
+        self._inflight[flight_key] = future
+        try:
+            result = await self._call_llm(llm, prompt)
+        except asyncio.CancelledError:
+            # Joiners were not cancelled themselves; tell them to retry instead
+            future.set_exception(_LeaderCancelled())
+            future.exception()  # Mark retrieved when nobody else is waiting
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else is waiting
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            self._inflight.pop(flight_key, None)
+        
+        if cache is not None:
+            cache.set(key, *result)
+        return result
+    
+    @staticmethod
+    async def _stream_llm(llm: ChatGroq, prompt: str) -> Tuple[str, int]:
+        """Stream a completion; returns (response_text, total_tokens)"""
+        parts = []
+        token_usage = 0
+        async for chunk in llm.astream(prompt):
+            parts.append(chunk.content)
+            # Usage arrives once, on the final chunk; read it there rather than
+            # relying on chunk addition to carry it through the merge
+            usage = getattr(chunk, "usage_metadata", None)
+            if usage:
+                token_usage = usage.get("total_tokens", 0)
+        return "".join(parts), token_usage
+    
+    async def _call_llm(self, llm: ChatGroq, prompt: str) -> Tuple[str, int]:
+        """Make one provider call under the backpressure limiter"""
+        return await get_llm_limiter().acall(self._stream_llm, llm, prompt)
+    
+    async def generate_code_node(self, state: CodeAgentState) -> Dict[str, Any]:
         """
         Node 1: Generate code using LLM
         
@@ -40,42 +257,25 @@ class AgentNodes:
         - Target programming language
         - Previous feedback (if any)
         """
-        logger.info(
-            "Generating code",
-            language=state["target_language"],
-            iteration=state["iteration_count"] + 1,
-        )
+        log = logger.bind(session_id=state.get("session_id"), language=state["target_language"])
+        log.info("Generating code", iteration=state["iteration_count"] + 1)
         
         # Build the prompt
         prompt = self._build_generation_prompt(state)
-
-        if state["iteration_count"] > 0 and state.get("review_feedback"):
-                prompt += f"\nCode Review Feedback: {state['review_feedback']}\nPlease fix ALL the issues and try again.\n"
         
         # Call LLM
         try:
             start_time = time.time()
-            response = self.llm.invoke(prompt)
+            response_text, token_usage = await self._invoke_cached(self.llm, prompt)
             elapsed_ms = (time.time() - start_time) * 1000
             
-            # Get response content (handle different response types)
-            if hasattr(response, 'content'):
-                response_text = response.content
-            else:
-                response_text = str(response)
-            
             # Extract code from response
             generated_code = self._extract_code_from_response(
                 response_text,
                 state["target_language"]
             )
             
-            # Get token usage safely
-            token_usage = 0
-            if hasattr(response, 'usage_metadata') and response.usage_metadata:
-                token_usage = response.usage_metadata.get("total_tokens", 0)
-            
-            logger.info(
+            log.info(
                 "Code generated successfully",
                 code_length=len(generated_code),
                 elapsed_ms=round(elapsed_ms, 2),
@@ -88,14 +288,14 @@ class AgentNodes:
                 "generated_code": generated_code,
                 "code_explanation": response_text,
                 "iteration_count": state["iteration_count"] + 1,
-                "llm_model_used": settings.groq_model,
+                "llm_model_used": self._model,
                 "llm_calls_made": state["llm_calls_made"] + 1,
                 "total_tokens_used": state["total_tokens_used"] + token_usage,
                 "status": "generating",
             }
             
         except Exception as e:
-            logger.error("Code generation failed", error=str(e), exc_info=True)
+            log.error("Code generation failed", error=str(e), exc_info=True)
             return {
                 "generated_code": "",
                 "error_message": f"Code generation failed: {str(e)}",
@@ -103,58 +303,23 @@ class AgentNodes:
             }
     
     def _build_generation_prompt(self, state: CodeAgentState) -> str:
-        """Build prompt for code generation"""
-        
-        language = state["target_language"]
-        problem = state["problem_description"]
-        
-        # Base prompt
-        prompt = f"""You are an expert {language.upper()} programmer. Generate clean, production-ready code.
-
-PROBLEM:
-{problem}
-
-PROGRAMMING LANGUAGE: {language.upper()}
-
-REQUIREMENTS:
-1. Write complete, runnable code
-2. Include all necessary imports
-3. Add clear comments explaining the logic
-4. Handle edge cases and errors
-5. Follow {language} best practices and style guidelines
-6. Make the code efficient and readable
-
-"""
-        
-        # Add feedback from previous iterations if any
-        if state["iteration_count"] > 0 and state["current_feedback"]:
-            prompt += f"""
-PREVIOUS ATTEMPT FAILED. FEEDBACK:
-{state["current_feedback"]}
-
-IMPORTANT: Fix the issues mentioned above and generate improved code.
-
-"""
+        """Build prompt for code generation (static head first so provider prefix caching hits)"""
         
-        prompt += f"""
-CRITICAL OUTPUT RULES:
-1. DO NOT include markdown code blocks (no ```)
-2. DO NOT include language tags like ```
-3. DO NOT add any explanations before or after the code
-4. START IMMEDIATELY with the first line of actual {language} code
-5. END with the last line of actual {language} code
-
-Your response MUST start with actual {language} code, not with ```:
-"""        
-        return prompt
+        # Feedback only applies after the first attempt
+        if state["iteration_count"] == 0:
+            return _generation_prompt(state["target_language"], state["problem_description"], "")
+        return _generation_prompt(
+            state["target_language"],
+            state["problem_description"],
+            state["current_feedback"] or "",
+            state.get("review_feedback") or "",
+        )
     
     def _extract_code_from_response(self, response: str, language: str) -> str:
         """
         Extract clean code from LLM response
         Removes markdown code blocks if present
         """
-        import re
-        
         # Handle if response is a list (convert to string)
         if isinstance(response, list):
             response = "\n".join(str(item) for item in response)
@@ -162,20 +327,16 @@ Your response MUST start with actual {language} code, not with ```:
         # Convert to string if it's not already
         response = str(response).strip()
         
-        # Try multiple patterns to extract code blocks
-        patterns = [
-            r"```(?:python|javascript|java|cpp?|go)\s*\n(.*?)\n``````python ... ```"
-            r"```\s*\n(.*?)\n`````` ... ```"
-            r"~~~(?:\w+)?\s*\n(.*?)\n~~~",  # ~~~ ... ~~~
-        ]
+        # Fast path: no fence markers means no regex work at all
+        if "```" not in response and "~~~" not in response:
+            logger.info("No markdown blocks found, using raw response")
+            return response
         
-        for pattern in patterns:
-            matches = re.findall(pattern, response, re.DOTALL | re.IGNORECASE)
-            if matches:
-                # Return the first code block found
-                code = matches.strip()
-                logger.info("Extracted code from markdown block", pattern=pattern)
-                return code
+        match = _FENCE_RE.search(response)
+        if match:
+            # Return the first code block found
+            logger.info("Extracted code from markdown block")
+            return match.group(1).strip()
         
         # If no code blocks found, check if response starts with markdown
         if response.startswith("```"):
@@ -190,15 +351,9 @@ Your response MUST start with actual {language} code, not with ```:
         logger.info("No markdown blocks found, using raw response")
         return response.strip()
     
-    def review_code_node(self, state: CodeAgentState) -> Dict[str, Any]:
-        reviewer = ChatGroq(
-            api_key=settings.groq_api_key,
-            model=settings.groq_model,
-            temperature=0.2,
-            max_tokens=2048
-        )
-        
+    async def review_code_node(self, state: CodeAgentState) -> Dict[str, Any]:
         requirements = state.get('requirements', 'No explicit requirements provided')
+        log = logger.bind(session_id=state.get("session_id"), language=state["target_language"])
         
         review_prompt = f"""
     You are a strict code reviewer for student programming assignments.
@@ -223,47 +378,61 @@ Your response MUST start with actual {language} code, not with ```:
 
     If the code meets all requirements and works correctly, respond with ONLY the word: PASS
 
-    If there are issues, list them briefly and clearly.
+    If there are issues, list them briefly and clearly, then give the complete corrected
+    {state['target_language']} code in a single fenced code block (```).
     """
         
-        review_result = reviewer.invoke(review_prompt)
+        response, token_usage = await self._invoke_cached(self.reviewer_llm, review_prompt)
         
-        if hasattr(review_result, 'content'):
-            feedback = review_result.content
-        else:
-            feedback = str(review_result)
+        # Review and regeneration in one call: a fenced block after the issues is the fixed code
+        revised_code = ""
+        feedback = response
+        match = _FENCE_RE.search(response)
+        if match and response.lstrip()[:4].upper() != "PASS":
+            revised_code = match.group(1).strip()
+            feedback = response[:match.start()].strip() or "Code revised by reviewer"
         
-        logger.info(f"Review feedback: {feedback[:200]}...")  # Log for debugging
+        log.info(f"Review feedback: {feedback[:200]}...", revised=bool(revised_code))  # Log for debugging
         
-        return {
+        # Identical code + feedback as last round means another retry would repeat itself
+        review_hash = _loop_hash(state["generated_code"], feedback)
+        
+        update = {
             **state,
-            "review_feedback": feedback
+            "review_feedback": feedback,
+            "review_revised": bool(revised_code),
+            # The reviewer itself approved this code (the graph may also force a pass)
+            "review_passed": not revised_code and "PASS" in feedback.upper(),
+            "last_review_hash": review_hash,
+            "review_stuck": review_hash == state.get("last_review_hash"),
         }
+        if revised_code:
+            update.update({
+                "generated_code": revised_code,
+                "iteration_count": state["iteration_count"] + 1,
+                "llm_calls_made": state["llm_calls_made"] + 1,
+                "total_tokens_used": state["total_tokens_used"] + token_usage,
+            })
+        return update
 
 
-    def execute_code_node(self, state: CodeAgentState) -> Dict[str, Any]:
+    async def execute_code_node(self, state: CodeAgentState) -> Dict[str, Any]:
         """
         Node 2: Execute code in Docker sandbox
         """
-        from src.execution.executor import CodeExecutor
-        
-        logger.info(
-            "Executing code in Docker",
-            language=state["target_language"],
-            code_length=len(state["generated_code"]),
-        )
+        log = logger.bind(session_id=state.get("session_id"), language=state["target_language"])
+        log.info("Executing code in Docker", code_length=len(state["generated_code"]))
         
         try:
-            executor = CodeExecutor()
-            
-            # Execute the code
-            result = executor.execute_code(
+            # Execute the code off the event loop; Docker calls block for the whole run
+            result = await self.executor.execute_code_async(
                 code=state["generated_code"],
                 language=state["target_language"],
-                timeout=settings.code_timeout_seconds,
+                timeout=self._timeout,
+                scope=state.get("session_id"),
             )
             
-            logger.info(
+            log.info(
                 "Code execution completed",
                 success=result["success"],
                 exit_code=result["exit_code"],
@@ -279,7 +448,7 @@ Your response MUST start with actual {language} code, not with ```:
             }
             
         except Exception as e:
-            logger.error("Execution node failed", error=str(e), exc_info=True)
+            log.error("Execution node failed", error=str(e), exc_info=True)
             return {
                 "execution_output": "",
                 "execution_error": f"Execution failed: {str(e)}",
@@ -289,78 +458,57 @@ Your response MUST start with actual {language} code, not with ```:
             }
 
     
-    def validate_code_node(self, state: 'CodeAgentState') -> dict:
+    async def validate_code_node(self, state: 'CodeAgentState') -> dict:
         """
         Multi-language validation node.
         Automatically runs language-appropriate quality/security tools,
         aggregates errors, and formats feedback for the agent.
+        The Docker tool runs block, so they go to a worker thread and other
+        questions keep progressing on the event loop meanwhile.
         """
         lang = state["target_language"]
         code = state["generated_code"]
         errors = []         # List of error/warning strings
         details = {}        # Dict {tool: raw_output}
+        log = logger.bind(session_id=state.get("session_id"), language=lang)
 
         try:
             if lang == "python":
                 from src.validation.quality import PythonValidator
-                validator = PythonValidator()
-                details = validator.validate(code)
-                # Collect errors from pylint, flake8, bandit, black
-                for tool in ["pylint", "flake8", "bandit", "black"]:
-                    out = details.get(tool, "")
-                    if out and "Error" in out or "warning" in out.lower() or "issue" in out.lower():
-                        errors.append(f"{tool}: {out.strip()[:200]}") # add first 200 chars for brevity
+                details = await asyncio.to_thread(PythonValidator().validate, code, scope=state.get("session_id"))
+                errors = _tool_errors(details, ("pylint", "flake8", "bandit", "black"), _WARN_TOKS[lang])
 
             elif lang == "javascript":
                 from src.validation.js_quality import JavaScriptValidator
-                validator = JavaScriptValidator()
-                details = validator.validate(code)
-                out = details.get("eslint", "")
-                if out and ("error" in out.lower() or "problem" in out.lower() or "warning" in out.lower()):
-                    errors.append(f"eslint: {out.strip()[:200]}")
+                details = await asyncio.to_thread(JavaScriptValidator().validate, code, scope=state.get("session_id"))
+                errors = _tool_errors(details, ("eslint",), _WARN_TOKS[lang])
 
             elif lang == "java":
                 from src.validation.java_quality import JavaValidator
-                validator = JavaValidator()
-                details = validator.validate(code)
-                out = details.get("javac", "")
-                if out and ("error" in out.lower() or "exception" in out.lower()):
-                    errors.append(f"javac: {out.strip()[:200]}")
+                details = await asyncio.to_thread(JavaValidator().validate, code, scope=state.get("session_id"))
+                errors = _tool_errors(details, ("javac",), _WARN_TOKS[lang])
 
             elif lang == "c":
                 from src.validation.c_quality import CValidator
-                validator = CValidator()
-                details = validator.validate(code)
-                for tool in ["cppcheck", "gcc"]:
-                    out = details.get(tool, "")
-                    if out and ("error" in out.lower() or "failed" in out.lower() or "warning" in out.lower()):
-                        errors.append(f"{tool}: {out.strip()[:200]}")
+                details = await asyncio.to_thread(CValidator().validate, code, scope=state.get("session_id"))
+                errors = _tool_errors(details, ("cppcheck", "gcc"), _WARN_TOKS[lang])
 
             elif lang == "cpp":
                 from src.validation.cpp_quality import CppValidator
-                validator = CppValidator()
-                details = validator.validate(code)
-                for tool in ["cppcheck", "g++"]:
-                    out = details.get(tool, "")
-                    if out and ("error" in out.lower() or "failed" in out.lower() or "warning" in out.lower()):
-                        errors.append(f"{tool}: {out.strip()[:200]}")
+                details = await asyncio.to_thread(CppValidator().validate, code, scope=state.get("session_id"))
+                errors = _tool_errors(details, ("cppcheck", "g++"), _WARN_TOKS[lang])
 
             elif lang == "go":
                 from src.validation.go_quality import GoValidator
-                validator = GoValidator()
-                details = validator.validate(code)
-                for tool in ["govet", "gobuild"]:
-                    out = details.get(tool, "")
-                    if out and ("error" in out.lower() or "fail" in out.lower() or "warning" in out.lower()):
-                        errors.append(f"{tool}: {out.strip()[:200]}")
+                details = await asyncio.to_thread(GoValidator().validate, code, scope=state.get("session_id"))
+                errors = _tool_errors(details, ("govet", "gobuild"), _WARN_TOKS[lang])
 
             else:
                 errors.append(f"Unsupported language: {lang}")
 
         except Exception as e:
-            logger.error(
+            log.error(
                 "Validation failed for language.",
-                language=lang,
                 error=str(e),
                 code=code[:200] if code else ""
             )
@@ -370,6 +518,7 @@ Your response MUST start with actual {language} code, not with ```:
 
         # Add additional metadata flags for agent
         feedback = "\n".join(errors) if errors else "No issues detected."
+        validation_hash = _loop_hash(code, feedback)
         # (later you can parse tool outputs more deeply here)
         return {
             "validation_passed": validation_passed,
@@ -383,6 +532,8 @@ Your response MUST start with actual {language} code, not with ```:
             "current_feedback": feedback,
             "feedback_history": state.get("feedback_history", []) + ([feedback] if feedback else []),
             "iteration_count": state.get("iteration_count", 0) + 1,
+            "last_validation_hash": validation_hash,
+            "validation_stuck": validation_hash == state.get("last_validation_hash"),
         }
     
     def generate_document_node(self, state: 'CodeAgentState') -> dict:
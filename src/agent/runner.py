@@ -3,10 +3,13 @@ Batch job runner for API integration
 """
 import asyncio
 from pathlib import Path
+from typing import Any, Dict, List, Tuple
 from src.agent.state import create_initial_state
-from src.agent.graph import CodeGenerationGraph
+from src.agent.graph import get_compiled_graph
+from src.agent.nodes import GENERATION_TEMPERATURE
 from src.agent.input_parser import parse_multi_question_file_with_meta
 from src.utils.docgen import generate_assignment_docx
+from src.utils.llm_cache import get_solution_cache
 from src.utils.logger import get_logger
 from src.utils.config import get_settings
 
@@ -14,7 +17,58 @@ logger = get_logger(__name__)
 settings = get_settings()
 
 
-def run_batch_job(input_file_path: str, output_dir: str) -> str:
+async def _run_questions(questions: List[Dict[str, Any]], input_file_path: str) -> List[Dict[str, Any]]:
+    """Run the workflow for every question, at most max_concurrent_questions at a time"""
+    app = get_compiled_graph()
+    semaphore = asyncio.Semaphore(settings.max_concurrent_questions)
+    solution_cache = get_solution_cache()
+    max_iterations = settings.max_iterations
+    
+    async def run_one(q):
+        async with semaphore:
+            logger.info(f"Processing Question {q['number']}")
+            
+            # Convert requirements to string
+            requirements_str = "\n".join(q["requirements"]) if isinstance(q["requirements"], list) else str(q["requirements"])
+            
+            # A question solved before skips the whole workflow, Docker runs included
+            key = None
+            if solution_cache is not None:
+                key = solution_cache.make_key(
+                    settings.groq_model, GENERATION_TEMPERATURE,
+                    q["question"], q["language"].lower(), requirements_str,
+                )
+                hit = solution_cache.get(key)
+                if hit is not None:
+                    logger.info(f"Question {q['number']}: solution cache hit")
+                    return {"generated_code": hit[0], "execution_output": hit[1]}
+            
+            # Create initial state
+            initial_state = create_initial_state(
+                problem_description=q["question"],
+                target_language=q["language"],
+                requirements=requirements_str,
+                input_file_path=input_file_path,
+                max_iterations=max_iterations,
+            )
+            final_state = await app.ainvoke(initial_state)
+            
+            # Only cache code that passed review and validation and ran cleanly in the sandbox
+            # (a pass forced at max_iterations or by a stuck loop is not review)
+            if (
+                key is not None
+                and final_state.get("review_passed")
+                and final_state.get("validation_passed")
+                and final_state.get("execution_success")
+                and final_state.get("generated_code")
+            ):
+                solution_cache.set(key, final_state["generated_code"], final_state.get("execution_output", ""))
+            return final_state
+    
+    return await asyncio.gather(*(run_one(q) for q in questions))
+
+
+def run_batch_job(input_file_path: str, output_dir: str) -> Tuple[str, Dict[str, int]]:
     """
     Run the complete workflow for an assignment file
     
@@ -23,7 +77,7 @@ def run_batch_job(input_file_path: str, output_dir: str) -> str:
         output_dir: Directory to save the output .docx
     
     Returns:
-        Path to the generated .docx file
+        Path to the generated .docx file and job stats ({"questions": n})
     
     Raises:
         Exception: If processing fails
@@ -32,44 +86,18 @@ def run_batch_job(input_file_path: str, output_dir: str) -> str:
         # Parse the input file
         meta, questions = parse_multi_question_file_with_meta(input_file_path)
         
-        results_for_doc = []
+        # Run all questions concurrently on one event loop
+        final_states = asyncio.run(_run_questions(questions, input_file_path))
         
-        # Process each question
-        for q in questions:
-            logger.info(f"Processing Question {q['number']}")
-            
-            # Convert requirements to string
-            requirements_str = "\n".join(q["requirements"]) if isinstance(q["requirements"], list) else str(q["requirements"])
-            
-            # Create initial state
-            initial_state = create_initial_state(
-                problem_description=q["question"],
-                target_language=q["language"],
-                requirements=requirements_str,
-                input_file_path=input_file_path,
-                max_iterations=settings.max_iterations,
-            )
-            
-            # Run the workflow
-            graph_builder = CodeGenerationGraph()
-            app = graph_builder.compile()
-            
-            # Run synchronously (API will handle async)
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            final_state = loop.run_until_complete(app.ainvoke(initial_state))
-            loop.close()
-            
-            # Collect results
-            code = final_state.get("generated_code", "")
-            output = final_state.get("execution_output", "")
-            
-            results_for_doc.append({
-                "number": q['number'],
-                "text": q['question'],
-                "code": code,
-                "output": output,
-            })
+        # Collect results by question index so completion order never matters
+        results_for_doc = [None] * len(questions)
+        for i, final_state in enumerate(final_states):
+            results_for_doc[i] = {
+                "number": questions[i]['number'],
+                "text": questions[i]['question'],
+                "code": final_state.get("generated_code", ""),
+                "output": final_state.get("execution_output", ""),
+            }
         
         # Generate output filename
         output_filename = f"{meta['subject'].replace(' ', '_')}_Assignment_{meta['assignment_number']}.docx"
@@ -89,7 +117,7 @@ def run_batch_job(input_file_path: str, output_dir: str) -> str:
         )
         
         logger.info(f"✅ Assignment complete: {output_path}")
-        return output_path
+        return output_path, {"questions": len(questions)}
         
     except Exception as e:
         logger.error(f"Job failed: {str(e)}", exc_info=True)
@@ -110,7 +138,7 @@ def test_runner():
     
     try:
         print(f"🚀 Starting job for: {input_file}")
-        result = run_batch_job(input_file, "data/output")
+        result, _ = run_batch_job(input_file, "data/output")
         print(f"✅ Success! Document saved to: {result}")
     except Exception as e:
         print(f"❌ Error: {str(e)}")
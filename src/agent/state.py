@@ -47,6 +47,13 @@ class CodeAgentState(TypedDict):
     max_iterations: int  # Maximum allowed iterations
     feedback_history: List[str]  # All feedback messages across iterations
     current_feedback: str  # Feedback for current iteration
+    review_feedback: str  # Latest LLM review of the generated code
+    review_revised: bool  # Reviewer returned corrected code along with its feedback
+    review_passed: bool  # Reviewer approved the current code (not a forced pass)
+    last_review_hash: str  # sha1 of (code, review feedback) from the previous review
+    review_stuck: bool  # Same code got the same review twice in a row
+    last_validation_hash: str  # sha1 of (code, validation feedback) from the previous validation
+    validation_stuck: bool  # Same code got the same validation errors twice in a row
     
     # ===== LLM TRACKING =====
     llm_model_used: str  # Which model generated the code
@@ -117,6 +124,13 @@ def create_initial_state(
         max_iterations=max_iterations,
         feedback_history=[],
         current_feedback="",
+        review_feedback="",
+        review_revised=False,
+        review_passed=False,
+        last_review_hash="",
+        review_stuck=False,
+        last_validation_hash="",
+        validation_stuck=False,
         
         # LLM Tracking
         llm_model_used="",
@@ -1,18 +1,38 @@
 """
 Admin dashboard endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+import base64
+import csv
+import io
+import os
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from src.api.models import User, Job, SystemMetrics, get_db
+from sqlalchemy import case, delete, func, insert, select
+from src.api.models import User, Job, SystemMetrics, db_session, engine, get_db
 from src.api.auth import get_current_active_user
+from src.api.cache import (
+    ADMIN_STATS_KEY, METRICS_ROLLUP_LOCK_KEY, STATS_CACHE_TTL_SECONDS,
+    acquire_lock, cache_counters, get_cached, set_cached,
+)
 from datetime import datetime, timedelta
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
-from typing import List
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
+# How often the background rollup writes a SystemMetrics row (0 disables it)
+METRICS_ROLLUP_SECONDS = int(os.getenv("METRICS_ROLLUP_SECONDS", "60"))
+# SystemMetrics rows older than this are deleted by the rollup (0 keeps them all)
+METRICS_RETENTION_DAYS = int(os.getenv("METRICS_RETENTION_DAYS", "30"))
+
+# Above this many rows, PostgreSQL metric inserts use COPY
+COPY_THRESHOLD_ROWS = 1000
+
 
 # Pydantic models
 class UserAdmin(BaseModel):
@@ -29,6 +49,11 @@ class UserAdmin(BaseModel):
         orm_mode = True
 
 
+class UserPage(BaseModel):
+    data: List[UserAdmin]
+    next_cursor: Optional[str] = None
+
+
 class SystemStats(BaseModel):
     total_users: int
     active_users_today: int
@@ -51,15 +76,60 @@ def require_admin(current_user: User = Depends(get_current_active_user)):
 
 
 
-@router.get("/users", response_model=List[UserAdmin])
+def _encode_cursor(last_id: int) -> str:
+    """Opaque keyset cursor for the last row id on a page"""
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> int:
+    """Row id a cursor points past; 400 on a malformed cursor"""
+    try:
+        return int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _page(db: Session, stmt, id_column, cursor: Optional[str], skip: int, limit: int):
+    """
+    Keyset page ordered by id: fetch limit+1 rows to learn whether more exist.
+    The legacy skip offset is only used when no cursor is given.
+    """
+    stmt = stmt.order_by(id_column)
+    if cursor:
+        stmt = stmt.where(id_column > _decode_cursor(cursor))
+    elif skip:
+        stmt = stmt.offset(skip)
+    rows = db.execute(stmt.limit(limit + 1)).scalars().all()
+    next_cursor = _encode_cursor(rows[limit - 1].id) if len(rows) > limit else None
+    return {"data": rows[:limit], "next_cursor": next_cursor}
+
+
+def admin_overview(db: Session, limit: int = 100) -> dict:
+    """Users (by id) and most recent jobs for the dashboard bundle (plain rows, no ORM objects)"""
+    users = db.execute(
+        select(User.id, User.username, User.email, User.total_jobs, User.is_active, User.is_admin)
+        .order_by(User.id)
+        .limit(limit)
+    ).mappings().all()
+    # Newest jobs first, with id breaking created_at ties
+    jobs = db.execute(
+        select(Job.job_id, Job.user_id, Job.status)
+        .order_by(Job.created_at.desc(), Job.id.desc())
+        .limit(limit)
+    ).mappings().all()
+    return {"users": [dict(u) for u in users], "jobs": [dict(j) for j in jobs]}
+
+
+@router.get("/users", response_model=UserPage)
 async def get_all_users(
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(100, ge=1, le=500),
     admin: User = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
-    users = db.query(User).offset(skip).limit(limit).all()
-    return users
+    """List users a page at a time; pass next_cursor back to get the following page"""
+    return _page(db, select(User), User.id, cursor, skip, limit)
 
 
 
@@ -68,27 +138,80 @@ async def get_system_stats(
     admin: User = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
-    """Get system-wide statistics"""
-    today = datetime.utcnow().date()
+    """Get system-wide statistics (latest rollup if fresh, cached for STATS_CACHE_TTL_SECONDS)"""
+    cached = await get_cached(ADMIN_STATS_KEY)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
     
-    total_users = db.query(func.count(User.id)).scalar()
-    active_today = db.query(func.count(User.id)).filter(
-        func.date(User.last_login) == today
-    ).scalar()
+    stats = _latest_rollup(db) or _compute_system_stats(db)
+    body = orjson.dumps(stats)
+    await set_cached(ADMIN_STATS_KEY, body, ttl=STATS_CACHE_TTL_SECONDS)
+    return Response(content=body, media_type="application/json")
+
+
+@router.get("/trends")
+async def get_job_trends(
+    days: int = Query(30, ge=1, le=365),
+    admin: User = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """Per-day job count, success rate and average processing time for the last `days` days"""
+    start = datetime.combine(datetime.utcnow().date(), datetime.min.time()) - timedelta(days=days - 1)
+    day = func.date(Job.created_at)
     
-    total_jobs = db.query(func.count(Job.id)).scalar()
-    jobs_today = db.query(func.count(Job.id)).filter(
-        func.date(Job.created_at) == today
-    ).scalar()
+    # One grouped query over the window instead of one query per day
+    rows = db.execute(
+        select(
+            day,
+            func.count(Job.id),
+            func.count(case((Job.status == "done", 1))),
+            func.avg(Job.processing_time_seconds),
+        )
+        .where(Job.created_at >= start)
+        .group_by(day)
+        .order_by(day)
+    ).all()
     
-    success_jobs = db.query(func.count(Job.id)).filter(Job.status == "done").scalar()
-    success_rate = (success_jobs / total_jobs * 100) if total_jobs > 0 else 0.0
+    return [
+        {
+            "date": str(date),
+            "jobs": jobs,
+            "success_rate": round(done / jobs * 100, 2) if jobs else 0.0,
+            "avg_processing_time": round(avg_time or 0.0, 2),
+        }
+        for date, jobs, done, avg_time in rows
+    ]
+
+
+@router.get("/cache-stats")
+async def get_cache_stats(admin: User = Depends(require_admin)):
+    """Redis read-cache hit/miss counters for this API process"""
+    return cache_counters()
+
+
+def _compute_system_stats(db: Session) -> dict:
+    """System-wide statistics (one aggregate query per table)"""
+    day_start = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    day_end = day_start + timedelta(days=1)
     
-    avg_time = db.query(func.avg(Job.processing_time_seconds)).filter(
-        Job.processing_time_seconds.isnot(None)
-    ).scalar() or 0.0
+    total_users, active_today, total_revenue = db.execute(
+        select(
+            func.count(User.id),
+            func.count(case(((User.last_login >= day_start) & (User.last_login < day_end), 1))),
+            func.sum(User.total_spent),
+        )
+    ).one()
     
-    total_revenue = db.query(func.sum(User.total_spent)).scalar() or 0.0
+    total_jobs, jobs_today, success_jobs, avg_time = db.execute(
+        select(
+            func.count(Job.id),
+            func.count(case(((Job.created_at >= day_start) & (Job.created_at < day_end), 1))),
+            func.count(case((Job.status == "done", 1))),
+            func.avg(Job.processing_time_seconds),  # AVG skips NULLs
+        )
+    ).one()
+    
+    success_rate = (success_jobs / total_jobs * 100) if total_jobs > 0 else 0.0
     
     return {
         "total_users": total_users,
@@ -96,27 +219,117 @@ async def get_system_stats(
         "total_jobs": total_jobs,
         "jobs_today": jobs_today or 0,
         "success_rate": round(success_rate, 2),
-        "avg_processing_time": round(avg_time, 2),
-        "total_revenue": round(total_revenue, 2)
+        "avg_processing_time": round(avg_time or 0.0, 2),
+        "total_revenue": round(total_revenue or 0.0, 2)
+    }
+
+
+def _latest_rollup(db: Session) -> Optional[dict]:
+    """Most recent SystemMetrics row as a stats dict, or None if rollups are off or stale"""
+    if METRICS_ROLLUP_SECONDS <= 0:
+        return None
+    fresh_after = datetime.utcnow() - timedelta(seconds=2 * METRICS_ROLLUP_SECONDS)
+    row = db.execute(
+        select(SystemMetrics)
+        .where(SystemMetrics.timestamp >= fresh_after)
+        .order_by(SystemMetrics.timestamp.desc())
+        .limit(1)
+    ).scalar_one_or_none()
+    if row is None:
+        return None
+    return {
+        "total_users": row.total_users,
+        "active_users_today": row.active_users_today,
+        "total_jobs": row.total_jobs_all_time,
+        "jobs_today": row.total_jobs_today,
+        "success_rate": row.success_rate,
+        "avg_processing_time": row.avg_processing_time,
+        "total_revenue": row.total_revenue,
     }
 
 
+def _metrics_row(stats: dict) -> dict:
+    """SystemMetrics column values for a stats dict"""
+    return {
+        "timestamp": datetime.utcnow(),
+        "total_users": stats["total_users"],
+        "active_users_today": stats["active_users_today"],
+        "total_jobs_today": stats["jobs_today"],
+        "total_jobs_all_time": stats["total_jobs"],
+        "success_rate": stats["success_rate"],
+        "avg_processing_time": stats["avg_processing_time"],
+        "total_revenue": stats["total_revenue"],
+    }
+
+
+def insert_metrics(rows: List[dict]):
+    """
+    Bulk-insert SystemMetrics rows (e.g. a backfill) in one round-trip.
+    Large batches on PostgreSQL are streamed with COPY instead of INSERT.
+    """
+    if not rows:
+        return
+    if engine.dialect.name == "postgresql" and len(rows) > COPY_THRESHOLD_ROWS:
+        columns = list(rows[0])
+        buf = io.StringIO()
+        csv.writer(buf).writerows([row[c] for c in columns] for row in rows)
+        buf.seek(0)
+        conn = engine.raw_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.copy_expert(
+                    f"COPY {SystemMetrics.__tablename__} ({', '.join(columns)}) FROM STDIN WITH CSV", buf
+                )
+            conn.commit()
+        finally:
+            conn.close()
+        return
+    with engine.begin() as conn:
+        conn.execute(insert(SystemMetrics), rows)
+
+
+def rollup_metrics():
+    """Compute system stats once, store them as a SystemMetrics row and drop expired rows"""
+    with db_session() as db:
+        stats = _compute_system_stats(db)
+        if METRICS_RETENTION_DAYS > 0:
+            cutoff = datetime.utcnow() - timedelta(days=METRICS_RETENTION_DAYS)
+            db.execute(delete(SystemMetrics).where(SystemMetrics.timestamp < cutoff))
+            db.commit()
+    insert_metrics([_metrics_row(stats)])
+
+
+async def run_metrics_rollup():
+    """
+    Background loop: roll up system metrics every METRICS_ROLLUP_SECONDS.
+    Every API worker runs the loop; the Redis lock lets one of them write
+    the row for each period.
+    """
+    while True:
+        try:
+            if await acquire_lock(METRICS_ROLLUP_LOCK_KEY, METRICS_ROLLUP_SECONDS):
+                await asyncio.to_thread(rollup_metrics)
+        except Exception as e:
+            logger.warning("⚠️ Metrics rollup failed", error=str(e))
+        await asyncio.sleep(METRICS_ROLLUP_SECONDS)
+
+
 @router.get("/jobs")
 async def get_all_jobs(
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(100, ge=1, le=500),
     status_filter: str = None,
     admin: User = Depends(require_admin),
     db: Session = Depends(get_db)
 ):
-    """Get all jobs with optional status filter"""
-    query = db.query(Job)
+    """Get all jobs with optional status filter, a page at a time ({data, next_cursor})"""
+    stmt = select(Job)
     
     if status_filter:
-        query = query.filter(Job.status == status_filter)
+        stmt = stmt.where(Job.status == status_filter)
     
-    jobs = query.offset(skip).limit(limit).all()
-    return jobs
+    return _page(db, stmt, Job.id, cursor, skip, limit)
 
 
 @router.post("/users/{user_id}/toggle-active")
@@ -126,7 +339,7 @@ async def toggle_user_active(
     db: Session = Depends(get_db)
 ):
     """Activate or deactivate a user"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
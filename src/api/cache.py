@@ -0,0 +1,117 @@
+"""
+Short-lived Redis cache for dashboard reads (/me, /analytics/usage, system stats)
+Disabled when REDIS_URL is not set; Redis errors fall through to the database
+"""
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+from redis.exceptions import RedisError
+import os
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL")
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+STATS_CACHE_TTL_SECONDS = int(os.getenv("STATS_CACHE_TTL_SECONDS", "30"))
+
+ADMIN_STATS_KEY = "admin:stats"
+SYSTEM_STATS_KEY = "system:stats"
+ACTIVE_JOBS_KEY = "active_jobs"  # hash: job_id -> {"user_id", "started_at"}
+ACTIVE_JOBS_STARTED_KEY = "active_jobs:started"  # sorted set: job_id scored by start time
+METRICS_ROLLUP_LOCK_KEY = "lock:metrics_rollup"
+
+_async_client = None
+_sync_client = None
+_counters = {"hits": 0, "misses": 0, "errors": 0}
+
+
+def me_key(user_id: int) -> str:
+    return f"me:{user_id}"
+
+
+def analytics_key(user_id: int) -> str:
+    return f"analytics:{user_id}"
+
+
+def get_async_client():
+    """Shared async Redis client, or None when REDIS_URL is not set"""
+    global _async_client
+    if _async_client is None and REDIS_URL:
+        _async_client = AsyncRedis.from_url(REDIS_URL, socket_timeout=0.5)
+    return _async_client
+
+
+async def get_cached(key: str):
+    """Return cached JSON bytes for key, or None on miss/unavailable cache"""
+    client = get_async_client()
+    if client is None:
+        return None
+    try:
+        body = await client.get(key)
+    except RedisError:
+        _counters["errors"] += 1
+        return None
+    _counters["hits" if body is not None else "misses"] += 1
+    return body
+
+
+async def set_cached(key: str, body: bytes, ttl: int = None):
+    """Store JSON bytes for key (default TTL: the user cache TTL)"""
+    client = get_async_client()
+    if client is None:
+        return
+    try:
+        await client.set(key, body, ex=ttl or USER_CACHE_TTL_SECONDS)
+    except RedisError:
+        _counters["errors"] += 1
+
+
+async def acquire_lock(key: str, ttl: int) -> bool:
+    """
+    Take a lock shared by every API worker for ttl seconds (SET NX EX); it is
+    never released early, so it also spaces repeated work ttl apart.
+    Always granted without Redis (a single process); refused if Redis errors.
+    """
+    client = get_async_client()
+    if client is None:
+        return True
+    try:
+        return bool(await client.set(key, b"1", nx=True, ex=ttl))
+    except RedisError:
+        _counters["errors"] += 1
+        return False
+
+
+def cache_counters() -> dict:
+    """Hit/miss/error counts for this process since startup"""
+    lookups = _counters["hits"] + _counters["misses"]
+    return {
+        **_counters,
+        "hit_rate": round(_counters["hits"] / lookups * 100, 2) if lookups else 0.0,
+        "enabled": bool(REDIS_URL),
+    }
+
+
+async def invalidate_user_async(user_id: int):
+    """Async variant of invalidate_user for request handlers"""
+    client = get_async_client()
+    if client is None:
+        return
+    try:
+        await client.delete(me_key(user_id), analytics_key(user_id))
+    except RedisError:
+        pass
+
+
+def invalidate_user(user_id: int):
+    """Drop a user's cached dashboard data (called when their jobs change)"""
+    global _sync_client
+    if not REDIS_URL:
+        return
+    if _sync_client is None:
+        _sync_client = Redis.from_url(REDIS_URL, socket_timeout=0.5)
+    try:
+        _sync_client.delete(me_key(user_id), analytics_key(user_id))
+    except RedisError as e:
+        logger.warning("⚠️ Could not invalidate user cache", user_id=user_id, error=str(e))
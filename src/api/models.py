@@ -1,16 +1,31 @@
 """
 Enhanced database models with billing, subscriptions, and analytics
 """
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, Float, ForeignKey, Enum as SQLEnum
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, Float, ForeignKey, Index, Uuid, Enum as SQLEnum
+from sqlalchemy.types import TypeDecorator
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from contextlib import contextmanager
 from datetime import datetime
 import os
 import enum
+import time
+import uuid
 
 # Database setup
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./ai_agent.db")
-engine = create_engine(DATABASE_URL)
+
+# Connection pool sizing for concurrent API load (ignored by SQLite's pools)
+engine_options = {"pool_pre_ping": True}
+if not DATABASE_URL.startswith("sqlite"):
+    engine_options.update(
+        pool_size=int(os.getenv("DB_POOL_SIZE", "20")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "40")),
+        pool_timeout=int(os.getenv("DB_POOL_TIMEOUT", "5")),
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    )
+
+engine = create_engine(DATABASE_URL, **engine_options)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -25,7 +40,7 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     is_admin = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
-    last_login = Column(DateTime, nullable=True)
+    last_login = Column(DateTime, nullable=True, index=True)  # range-scanned by /admin/stats
     
     # Usage tracking
     total_jobs = Column(Integer, default=0)
@@ -35,14 +50,39 @@ class User(Base):
     
     
     # Relationships
-    jobs = relationship("Job", back_populates="user")
+    jobs = relationship("Job", back_populates="user", lazy="raise")
+
+def new_job_id() -> str:
+    """
+    Time-ordered UUID (version 7 layout) in canonical 36-char form: 48-bit ms
+    timestamp, then random bits.
+    New ids land at the right edge of the job_id index instead of random pages.
+    """
+    value = (int(time.time() * 1000) & ((1 << 48) - 1)) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = (value & ~(0xF << 76)) | (0x7 << 76)  # version 7
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)  # RFC 4122 variant
+    return str(uuid.UUID(int=value))
+
+class JobId(TypeDecorator):
+    """
+    UUID column exchanged as the canonical dashed string on every backend
+    (native uuid on PostgreSQL, 32-char hex on SQLite); accepts any UUID spelling
+    """
+    impl = Uuid(as_uuid=False)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return str(uuid.UUID(str(value))) if value is not None else None
+
+    def process_result_value(self, value, dialect):
+        return str(uuid.UUID(str(value))) if value is not None else None
 
 class Job(Base):
     """Enhanced job tracking with detailed metrics"""
     __tablename__ = "jobs"
     
     id = Column(Integer, primary_key=True, index=True)
-    job_id = Column(String, unique=True, index=True, nullable=False)
+    job_id = Column(JobId(), unique=True, index=True, nullable=False)  # native uuid on PostgreSQL
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     status = Column(String, default="queued")  # queued, processing, done, error
     input_file_path = Column(String)
@@ -64,14 +104,21 @@ class Job(Base):
     cost = Column(Float, default=0.0)  # Cost for this job
     
     # Relationships
-    user = relationship("User", back_populates="jobs")
+    user = relationship("User", back_populates="jobs", lazy="raise")
+    
+    __table_args__ = (
+        # Serves "jobs for a user, newest first" (/my-jobs, /me) without a sort
+        Index("ix_jobs_user_id_created_at", "user_id", created_at.desc()),
+        # Serves /admin/jobs?status_filter=... and status-scoped recent-job lists
+        Index("ix_jobs_status_created_at", "status", created_at.desc()),
+    )
 
 class SystemMetrics(Base):
     """Track system-wide metrics over time"""
     __tablename__ = "system_metrics"
     
     id = Column(Integer, primary_key=True, index=True)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)  # latest-row lookups by /admin/stats
     
     # Metrics
     total_users = Column(Integer, default=0)
@@ -82,8 +129,9 @@ class SystemMetrics(Base):
     avg_processing_time = Column(Float, default=0.0)
     total_revenue = Column(Float, default=0.0)
 
-# Create all tables
-Base.metadata.create_all(bind=engine)
+def init_db():
+    """Create any missing tables; called once at app startup, not on import"""
+    Base.metadata.create_all(bind=engine)
 
 def get_db():
     """Dependency for database sessions"""
@@ -92,3 +140,12 @@ def get_db():
         yield db
     finally:
         db.close()
+
+@contextmanager
+def db_session():
+    """Session for code outside FastAPI dependencies; closed when the block exits"""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -3,34 +3,92 @@ Advanced notification and user experience features
 """
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
-from src.api.models import get_db, User, Job
+from sqlalchemy import bindparam, case, func, select
+from src.api.models import db_session, User, Job
+from redis.exceptions import RedisError
+from src.api.cache import (
+    ACTIVE_JOBS_KEY, ACTIVE_JOBS_STARTED_KEY, SYSTEM_STATS_KEY, STATS_CACHE_TTL_SECONDS,
+    get_async_client, get_cached, set_cached,
+)
 from src.utils.email_service import send_job_completion_email
+from src.utils.logger import get_logger
 import asyncio
+import orjson
+
+logger = get_logger(__name__)
+
+# Statements built once; SQLAlchemy's compiled cache then skips re-compiling them per call
+_USER_CONTACT_STMT = select(User.email, User.username).where(User.id == bindparam("user_id"))
+
+_RECENT_FINISHED_JOBS_STMT = (
+    select(Job.job_id, Job.status, Job.created_at, Job.completed_at)
+    .where(Job.user_id == bindparam("user_id"), Job.status.in_(("done", "error")))
+    .order_by(Job.created_at.desc())
+    .limit(10)
+)
+
+_SYSTEM_STATS_STMT = select(
+    select(func.count(User.id)).scalar_subquery(),
+    func.count(Job.id),
+    func.count(case((Job.status == "done", 1))),
+    func.count(case(((Job.created_at >= bindparam("day_start")) & (Job.created_at < bindparam("day_end")), 1))),
+).select_from(Job)
 
 class NotificationService:
-    """Service to handle all types of notifications"""
+    """
+    Service to handle all types of notifications
+    
+    Active jobs live in Redis (shared by every API worker) when REDIS_URL is set,
+    and in a per-process dict otherwise.
+    """
+    
+    STALE_AFTER = timedelta(minutes=10)
     
     def __init__(self):
-        self.active_jobs = {}  # Track jobs being processed
+        self.active_jobs = {}  # Track jobs being processed (no-Redis fallback)
     
-    async def notify_job_started(self, user_id: int, job_id: str):
-        """Notify when job processing starts"""
+    async def _track(self, user_id: int, job_id: str, started_at: datetime):
+        client = get_async_client()
+        if client is not None:
+            try:
+                async with client.pipeline(transaction=True) as pipe:
+                    pipe.hset(ACTIVE_JOBS_KEY, job_id, orjson.dumps({"user_id": user_id, "started_at": started_at}))
+                    pipe.zadd(ACTIVE_JOBS_STARTED_KEY, {job_id: started_at.timestamp()})
+                    await pipe.execute()
+                return
+            except RedisError as e:
+                logger.warning("⚠️ Could not track job in Redis", job_id=job_id[:8], error=str(e))
         self.active_jobs[job_id] = {
             'user_id': user_id,
-            'started_at': datetime.utcnow(),
+            'started_at': started_at,
             'status': 'processing'
         }
-        print(f"🚀 Job {job_id[:8]} started for user {user_id}")
+    
+    async def _untrack(self, job_id: str):
+        self.active_jobs.pop(job_id, None)
+        client = get_async_client()
+        if client is not None:
+            try:
+                async with client.pipeline(transaction=True) as pipe:
+                    pipe.hdel(ACTIVE_JOBS_KEY, job_id)
+                    pipe.zrem(ACTIVE_JOBS_STARTED_KEY, job_id)
+                    await pipe.execute()
+            except RedisError as e:
+                logger.warning("⚠️ Could not untrack job in Redis", job_id=job_id[:8], error=str(e))
+    
+    async def notify_job_started(self, user_id: int, job_id: str):
+        """Notify when job processing starts"""
+        await self._track(user_id, job_id, datetime.utcnow())
+        logger.info("🚀 Job started", job_id=job_id[:8], user_id=user_id)
     
     async def notify_job_completed(self, user_id: int, job_id: str, language: str, 
                                  processing_time: str, questions_count: int):
         """Notify when job is completed"""
-        if job_id in self.active_jobs:
-            del self.active_jobs[job_id]
+        await self._untrack(job_id)
         
-        # Get user info
-        db = next(get_db())
-        user = db.query(User).filter(User.id == user_id).first()
+        # Get user info (only the columns the email needs)
+        with db_session() as db:
+            user = db.execute(_USER_CONTACT_STMT, {"user_id": user_id}).first()
         
         if user:
             # Send email notification
@@ -39,31 +97,63 @@ class NotificationService:
                 language, processing_time, questions_count
             )
         
-        print(f"✅ Job {job_id[:8]} completed for user {user_id}")
+        logger.info("✅ Job completed", job_id=job_id[:8], user_id=user_id)
     
     async def notify_job_failed(self, user_id: int, job_id: str, error_message: str):
         """Notify when job fails"""
-        if job_id in self.active_jobs:
-            del self.active_jobs[job_id]
+        await self._untrack(job_id)
         
-        print(f"❌ Job {job_id[:8]} failed for user {user_id}: {error_message}")
+        logger.warning("❌ Job failed", job_id=job_id[:8], user_id=user_id, error=error_message)
     
-    def get_active_jobs(self) -> Dict:
+    async def get_active_jobs(self) -> Dict:
         """Get all currently active jobs"""
-        return self.active_jobs
+        client = get_async_client()
+        if client is not None:
+            try:
+                raw = await client.hgetall(ACTIVE_JOBS_KEY)
+                return {job_id.decode(): orjson.loads(info) for job_id, info in raw.items()}
+            except RedisError:
+                pass
+        return dict(self.active_jobs)
+    
+    async def active_job_count(self) -> int:
+        """Number of active jobs (HLEN when shared in Redis)"""
+        client = get_async_client()
+        if client is not None:
+            try:
+                return await client.hlen(ACTIVE_JOBS_KEY)
+            except RedisError:
+                pass
+        return len(self.active_jobs)
+    
+    async def _stale_jobs(self) -> Dict[str, int]:
+        """job_id -> user_id for jobs started longer than STALE_AFTER ago"""
+        cutoff = datetime.utcnow() - self.STALE_AFTER
+        client = get_async_client()
+        if client is not None:
+            try:
+                # Oldest-first index: only the stale range is read, not every active job
+                job_ids = await client.zrangebyscore(ACTIVE_JOBS_STARTED_KEY, "-inf", cutoff.timestamp())
+                if not job_ids:
+                    return {}
+                infos = await client.hmget(ACTIVE_JOBS_KEY, job_ids)
+                return {
+                    job_id.decode(): orjson.loads(info)["user_id"] if info else None
+                    for job_id, info in zip(job_ids, infos)
+                }
+            except RedisError:
+                pass
+        return {
+            job_id: info['user_id']
+            for job_id, info in self.active_jobs.items()
+            if info['started_at'] < cutoff
+        }
     
     async def cleanup_stale_jobs(self):
         """Clean up jobs that have been running too long"""
-        current_time = datetime.utcnow()
-        stale_jobs = []
-        
-        for job_id, info in self.active_jobs.items():
-            if current_time - info['started_at'] > timedelta(minutes=10):
-                stale_jobs.append(job_id)
-        
-        for job_id in stale_jobs:
+        for job_id, user_id in (await self._stale_jobs()).items():
             await self.notify_job_failed(
-                self.active_jobs[job_id]['user_id'],
+                user_id,
                 job_id,
                 "Job timed out - exceeded maximum processing time"
             )
@@ -73,12 +163,9 @@ notification_service = NotificationService()
 
 async def get_user_notifications(user_id: int) -> List[Dict]:
     """Get recent notifications for a user"""
-    db = next(get_db())
-    
-    # Get recent jobs
-    recent_jobs = db.query(Job).filter(
-        Job.user_id == user_id
-    ).order_by(Job.created_at.desc()).limit(10).all()
+    # Get recent finished jobs: only the columns shown, status filtered in SQL
+    with db_session() as db:
+        recent_jobs = db.execute(_RECENT_FINISHED_JOBS_STMT, {"user_id": user_id}).all()
     
     notifications = []
     for job in recent_jobs:
@@ -87,42 +174,42 @@ async def get_user_notifications(user_id: int) -> List[Dict]:
                 'type': 'success',
                 'title': 'Assignment Complete!',
                 'message': f'Job {job.job_id[:8]} finished successfully',
-                'timestamp': job.updated_at or job.created_at,
+                'timestamp': job.completed_at or job.created_at,
                 'action': f'/download/{job.job_id}'
             })
-        elif job.status == 'error':
+        else:
             notifications.append({
                 'type': 'error', 
                 'title': 'Assignment Failed',
                 'message': f'Job {job.job_id[:8]} encountered an error',
-                'timestamp': job.updated_at or job.created_at,
+                'timestamp': job.completed_at or job.created_at,
                 'action': '/dashboard'
             })
     
     return notifications
 
 async def get_system_stats() -> Dict:
-    """Get system-wide statistics"""
-    db = next(get_db())
-    
-    # Get various stats
-    total_users = db.query(User).count()
-    total_jobs = db.query(Job).count()
-    successful_jobs = db.query(Job).filter(Job.status == 'done').count()
+    """Get system-wide statistics (cached for STATS_CACHE_TTL_SECONDS)"""
+    cached = await get_cached(SYSTEM_STATS_KEY)
+    if cached is not None:
+        return orjson.loads(cached)
     
-    # Get today's stats
-    today = datetime.utcnow().date()
-    jobs_today = db.query(Job).filter(
-        Job.created_at >= today
-    ).count()
+    # Get various stats, including today's, in one round-trip
+    day_start = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    with db_session() as db:
+        total_users, total_jobs, successful_jobs, jobs_today = db.execute(
+            _SYSTEM_STATS_STMT, {"day_start": day_start, "day_end": day_start + timedelta(days=1)}
+        ).one()
     
     success_rate = (successful_jobs / total_jobs * 100) if total_jobs > 0 else 0
     
-    return {
+    stats = {
         'total_users': total_users,
         'total_jobs': total_jobs,
         'successful_jobs': successful_jobs,
         'jobs_today': jobs_today,
         'success_rate': round(success_rate, 1),
-        'active_jobs': len(notification_service.get_active_jobs())
+        'active_jobs': await notification_service.active_job_count()
     }
+    await set_cached(SYSTEM_STATS_KEY, orjson.dumps(stats), ttl=STATS_CACHE_TTL_SECONDS)
+    return stats
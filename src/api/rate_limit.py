@@ -4,5 +4,18 @@ Rate limiting for API endpoints
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
+import os
 
-limiter = Limiter(key_func=get_remote_address)
+# Share counters across workers via Redis when available; the moving-window
+# strategy is enforced atomically by the limits Redis backend (Lua script).
+# If Redis goes away, fall back to per-process memory counters rather than
+# failing every rate-limited request.
+RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", os.getenv("REDIS_URL", "memory://"))
+
+limiter = Limiter(
+    key_func=get_remote_address,
+    storage_uri=RATE_LIMIT_STORAGE_URI,
+    strategy="moving-window",
+    in_memory_fallback_enabled=True,
+    swallow_errors=True,
+)
@@ -0,0 +1,156 @@
+"""
+Background job queue backed by Redis (RQ)
+Falls back to an in-process thread pool when REDIS_URL is not set
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from redis import Redis
+from redis.exceptions import RedisError
+from rq import Queue, Retry, get_current_job
+import asyncio
+import os
+
+from src.agent.runner import run_batch_job
+from src.api.models import User, Job, db_session
+from src.api.cache import invalidate_user
+from src.utils.language_config import get_language_config
+from src.utils.email_service import send_welcome_email, send_job_completion_email
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Queue configuration
+REDIS_URL = os.getenv("REDIS_URL")
+JOB_QUEUE_NAME = os.getenv("JOB_QUEUE_NAME", "assignments")
+JOB_TIMEOUT_SECONDS = int(os.getenv("JOB_TIMEOUT_SECONDS", "600"))
+JOB_MAX_RETRIES = int(os.getenv("JOB_MAX_RETRIES", "2"))
+LOCAL_JOB_WORKERS = int(os.getenv("LOCAL_JOB_WORKERS", "4"))
+
+_queue = None
+_local_executor = None
+
+
+def get_queue():
+    """Get the shared job queue, or None when Redis is not configured"""
+    global _queue
+    if _queue is None and REDIS_URL:
+        _queue = Queue(
+            JOB_QUEUE_NAME,
+            connection=Redis.from_url(REDIS_URL),
+            default_timeout=JOB_TIMEOUT_SECONDS,
+        )
+    return _queue
+
+
+def get_local_executor() -> ThreadPoolExecutor:
+    """Get the dedicated in-process job pool used when Redis is not available"""
+    global _local_executor
+    if _local_executor is None:
+        _local_executor = ThreadPoolExecutor(
+            max_workers=LOCAL_JOB_WORKERS, thread_name_prefix="job-worker"
+        )
+    return _local_executor
+
+
+def enqueue(func, *args, inline: bool = False):
+    """
+    Run a task on a queue worker
+
+    Failed queue jobs are retried up to JOB_MAX_RETRIES times. Falls back to a
+    dedicated thread pool (or a direct call when `inline`) when Redis is not
+    configured or unreachable, so local setups keep working without tying up
+    the request threadpool. Talks to Redis synchronously: call it from async
+    code via asyncio.to_thread.
+    """
+    queue = get_queue()
+    if queue is not None:
+        try:
+            queue.enqueue(func, *args, retry=Retry(max=JOB_MAX_RETRIES))
+            return
+        except RedisError as e:
+            logger.warning("⚠️ Job queue unavailable, running in-process", task=func.__name__, error=str(e))
+
+    if inline:
+        func(*args)
+    else:
+        get_local_executor().submit(func, *args)
+
+
+def send_welcome_email_task(user_email: str, username: str):
+    """Send the welcome email from a queue worker"""
+    asyncio.run(send_welcome_email(user_email, username))
+
+
+def send_job_completion_email_task(user_email: str, username: str, job_id: str,
+                                   language: str, processing_time: str, questions_count: int):
+    """Send the job completion email from a queue worker"""
+    asyncio.run(send_job_completion_email(
+        user_email, username, job_id, language, processing_time, questions_count
+    ))
+
+
+def process_assignment_job(job_id: str, input_path: str, user_id: int, language: str = "python",
+                           output_dir: str = "data/api_jobs/output"):
+    """
+    Process assignment with enhanced language support
+
+    Failures are recorded and re-raised so RQ can retry the job; the job is
+    only marked "error" once no retries are left (it stays "processing" meanwhile).
+    """
+    with db_session() as db:
+        job = db.query(Job).filter(Job.job_id == job_id).first()
+
+        try:
+            job.status = "processing"
+            db.commit()
+
+            start_time = datetime.utcnow()
+
+            # Get language configuration
+            lang_config = get_language_config(language)
+            logger.info("🚀 Processing assignment", job_id=job_id[:8], language=lang_config.name)
+
+            # Run the actual job
+            result_file, stats = run_batch_job(input_path, output_dir)
+
+            end_time = datetime.utcnow()
+            processing_time = str(end_time - start_time)
+
+            job.status = "done"
+            job.error_message = None  # left by an earlier failed attempt
+            job.output_file_path = result_file
+            job.completed_at = end_time
+            job.processing_time_seconds = (end_time - start_time).total_seconds()
+
+            # Update user stats
+            user = db.query(User).filter(User.id == user_id).first()
+            user.total_jobs += 1
+            db.commit()
+            invalidate_user(user_id)
+
+        except Exception as e:
+            db.rollback()  # a failed flush/commit leaves the session unusable until rolled back
+            current = get_current_job()
+            retrying = current is not None and (current.retries_left or 0) > 0
+            if not retrying:
+                job.status = "error"
+            job.error_message = str(e)
+            db.commit()
+            invalidate_user(user_id)
+            logger.warning("❌ Job failed", job_id=job_id[:8], retrying=retrying, error=str(e))
+            raise
+
+        # Question count comes from the parse done by run_batch_job
+        questions_count = stats["questions"]
+
+        logger.info("✅ Job completed", job_id=job_id[:8], questions=questions_count)
+        user_email, username = user.email, user.username
+
+    # Send completion notification (outside the retried part: the job itself is done)
+    try:
+        enqueue(
+            send_job_completion_email_task, user_email, username, job_id,
+            language, processing_time, questions_count, inline=True
+        )
+    except Exception as e:
+        logger.warning("⚠️ Completion email failed", job_id=job_id[:8], error=str(e))
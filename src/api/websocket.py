@@ -4,14 +4,25 @@ Real-time notifications via WebSocket
 import socketio
 from src.api.auth import decode_jwt_token
 from src.api.models import get_db, Job
+from src.utils.logger import get_logger
+from datetime import datetime
 import asyncio
 
-# Create Socket.IO server
-sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins="*")
+logger = get_logger(__name__)
+
+# Create Socket.IO server (msgpack packets: smaller and faster to parse than JSON;
+# clients need the matching msgpack parser, e.g. socket.io-msgpack-parser)
+sio = socketio.AsyncServer(async_mode='asgi', serializer='msgpack', cors_allowed_origins="*")
 
 # Store active connections
 active_connections = {}
 
+# Back-to-back job_status updates for a user within this window are coalesced
+STATUS_COALESCE_SECONDS = 0.05
+
+# user_id -> {job_id: latest notification} waiting to be flushed
+_pending_status = {}
+
 @sio.event
 async def connect(sid, environ, auth):
     """Handle client connection"""
@@ -34,11 +45,11 @@ async def connect(sid, environ, auth):
         await sio.enter_room(sid, f"user_{user_id}")
         await sio.emit('connected', {'status': 'Connected to notifications'}, room=sid)
         
-        print(f"User {user_id} connected via WebSocket")
+        logger.info("User connected via WebSocket", user_id=user_id)
         return True
         
     except Exception as e:
-        print(f"Connection error: {e}")
+        logger.warning("WebSocket connection error", error=str(e))
         await sio.disconnect(sid)
         return False
 
@@ -48,7 +59,7 @@ async def disconnect(sid):
     user_id = active_connections.pop(sid, None)
     if user_id:
         await sio.leave_room(sid, f"user_{user_id}")
-        print(f"User {user_id} disconnected")
+        logger.info("User disconnected", user_id=user_id)
 
 async def notify_job_status(user_id: int, job_id: str, status: str, message: str = None):
     """Send job status notification to user"""
@@ -59,7 +70,21 @@ async def notify_job_status(user_id: int, job_id: str, status: str, message: str
         'timestamp': datetime.utcnow().isoformat()
     }
     
-    await sio.emit('job_status', notification, room=f"user_{user_id}")
+    pending = _pending_status.get(user_id)
+    if pending is not None:
+        # A flush is already scheduled; only the newest status per job is sent
+        pending[job_id] = notification
+        return
+    
+    _pending_status[user_id] = {job_id: notification}
+    asyncio.create_task(_flush_job_status(user_id))
+
+async def _flush_job_status(user_id: int):
+    """Emit the latest status of each job queued for a user during the coalesce window"""
+    await asyncio.sleep(STATUS_COALESCE_SECONDS)
+    pending = _pending_status.pop(user_id, {})
+    for notification in pending.values():
+        await sio.emit('job_status', notification, room=f"user_{user_id}")
 
 async def notify_system_alert(message: str, level: str = "info"):
     """Send system-wide notification"""
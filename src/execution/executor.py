@@ -3,9 +3,17 @@ Code Execution Engine
 Executes code in isolated Docker containers with security and resource limits
 """
 
+import asyncio
+import atexit
 import docker
+import hashlib
+import io
+import tarfile
 import tempfile
+import threading
 import os
+import uuid
+from collections import OrderedDict
 from pathlib import Path
 from typing import Dict, Tuple, Optional
 import time
@@ -15,6 +23,9 @@ from src.utils.config import get_settings
 logger = get_logger(__name__)
 settings = get_settings()
 
+# Caps concurrent sandbox runs across every job in this process
+_sandbox_slots = threading.BoundedSemaphore(settings.max_concurrent_sandboxes)
+
 
 class CodeExecutor:
     """Execute code in Docker containers with security sandboxing"""
@@ -39,8 +50,29 @@ class CodeExecutor:
         "go": ".go",
     }
     
+    # Image presence rarely changes; re-check at most this often
+    IMAGE_CHECK_TTL_SECONDS = 60
+    
+    # Compiled languages whose warm-container builds are cached on the host by source hash
+    COMPILED_LANGUAGES = frozenset({"c", "cpp", "java"})
+    BUILD_CACHE_MAX_ENTRIES = 256
+    
+    # Exit status of coreutils/busybox `timeout` when the command ran too long
+    TIMEOUT_EXIT_CODE = 124
+    
+    # Warm containers unused this long are stopped
+    WARM_IDLE_SECONDS = 120
+    
     def __init__(self):
         """Initialize Docker client"""
+        self._images_available: Dict[str, bool] = {}
+        self._images_checked_at: Optional[float] = None
+        # (scope, language) -> [container, run lock, last used]; a scope is one question's session
+        self._warm: Dict[Tuple[str, str], list] = {}
+        self._warm_lock = threading.Lock()
+        self._builds: "OrderedDict[str, bytes]" = OrderedDict()  # source digest -> build tar (LRU)
+        self._builds_lock = threading.Lock()
+        self._shutdown_registered = False
         try:
             self.client = docker.from_env()
             logger.info("Docker client initialized successfully")
@@ -55,7 +87,8 @@ class CodeExecutor:
         self,
         code: str,
         language: str,
-        timeout: int = None
+        timeout: int = None,
+        scope: str = None
     ) -> Dict[str, any]:
         """
         Execute code in a Docker container
@@ -64,6 +97,9 @@ class CodeExecutor:
             code: Source code to execute
             language: Programming language (python, javascript, etc.)
             timeout: Maximum execution time in seconds
+            scope: Owner of the run (a question's session id); with
+                DOCKER_WARM_CONTAINERS on, runs of one scope reuse a container
+                that no other scope ever shares
             
         Returns:
             Dict with:
@@ -94,6 +130,14 @@ class CodeExecutor:
             timeout=timeout,
         )
         
+        if settings.docker_warm_containers and scope is not None:
+            try:
+                return self._execute_in_warm_container(code, language, timeout, scope)
+            except Exception as e:
+                logger.warning("Warm container execution failed, using a one-shot container",
+                               error=str(e), language=language)
+                self._discard_warm(scope, language)
+        
         try:
             # Create temporary file with code
             with tempfile.NamedTemporaryFile(
@@ -131,6 +175,25 @@ class CodeExecutor:
                 "execution_time_ms": 0.0,
             }
     
+    async def execute_code_async(
+        self,
+        code: str,
+        language: str,
+        timeout: int = None,
+        scope: str = None
+    ) -> Dict[str, any]:
+        """
+        Awaitable execute_code: Docker calls run in a worker thread so the event
+        loop stays free, and at most max_concurrent_sandboxes run at once
+        """
+        return await asyncio.to_thread(self._execute_with_slot, code, language, timeout, scope)
+    
+    def _execute_with_slot(self, code: str, language: str, timeout: int = None,
+                           scope: str = None) -> Dict[str, any]:
+        """Run execute_code once a sandbox slot is free (called from a worker thread)"""
+        with _sandbox_slots:
+            return self.execute_code(code, language, timeout, scope)
+    
     def _execute_in_container(
         self,
         file_path: str,
@@ -143,7 +206,7 @@ class CodeExecutor:
         file_name = os.path.basename(file_path)
         
         # Build execution command based on language
-        command = self._build_command(language, file_name)
+        command = self._build_command(language, f"/code/{file_name}", "/tmp")
         
         # Container configuration
         container_config = {
@@ -175,9 +238,10 @@ class CodeExecutor:
             result = container.wait(timeout=timeout)
             elapsed_ms = (time.time() - start_time) * 1000
             
-            # Get logs before removing container
-            output = container.logs(stdout=True, stderr=False).decode('utf-8')
-            error = container.logs(stdout=False, stderr=True).decode('utf-8')
+            # Get logs before removing container: one demuxed read for both streams
+            stdout, stderr = container.attach(stdout=True, stderr=True, logs=True, stream=False, demux=True)
+            output = (stdout or b"").decode('utf-8', errors='replace')
+            error = (stderr or b"").decode('utf-8', errors='replace')
             exit_code = result['StatusCode']
             
             success = exit_code == 0
@@ -244,42 +308,253 @@ class CodeExecutor:
                     pass
 
     
-    def _build_command(self, language: str, file_name: str) -> list:
-        """Build execution command for each language"""
+    def _build_command(self, language: str, source_path: str, work_dir: str) -> list:
+        """Build execution command for each language (build outputs go to work_dir)"""
         
         commands = {
-            "python": ["python", f"/code/{file_name}"],
-            "javascript": ["node", f"/code/{file_name}"],
-            "java": self._build_java_command(file_name),
-            "c": self._build_c_command(file_name),
-            "cpp": self._build_cpp_command(file_name),
-            "go": ["go", "run", f"/code/{file_name}"],
+            "python": ["python", source_path],
+            "javascript": ["node", source_path],
+            "java": self._build_java_command(source_path, work_dir),
+            "c": self._build_c_command(source_path, work_dir),
+            "cpp": self._build_cpp_command(source_path, work_dir),
+            "go": ["go", "run", source_path],
         }
         
         return commands.get(language, [])
     
-    def _build_java_command(self, file_name: str) -> list:
+    def _build_java_command(self, source_path: str, work_dir: str) -> list:
         """Build Java compile + run command"""
-        class_name = file_name.replace('.java', '')
+        class_name = os.path.basename(source_path).replace('.java', '')
         return [
             "/bin/sh", "-c",
-            f"javac /code/{file_name} && java -cp /code {class_name}"
+            f"mkdir -p {work_dir} && javac -d {work_dir} {source_path} && java -cp {work_dir} {class_name}"
         ]
     
-    def _build_c_command(self, file_name: str) -> list:
+    def _build_c_command(self, source_path: str, work_dir: str) -> list:
         """Build C compile + run command"""
         return [
             "/bin/sh", "-c",
-            f"gcc /code/{file_name} -o /tmp/program && /tmp/program"
+            f"mkdir -p {work_dir} && gcc {source_path} -o {work_dir}/program && {work_dir}/program"
         ]
     
-    def _build_cpp_command(self, file_name: str) -> list:
+    def _build_cpp_command(self, source_path: str, work_dir: str) -> list:
         """Build C++ compile + run command"""
         return [
             "/bin/sh", "-c",
-            f"g++ /code/{file_name} -o /tmp/program && /tmp/program"
+            f"mkdir -p {work_dir} && g++ {source_path} -o {work_dir}/program && {work_dir}/program"
         ]
     
+    def _compile_command(self, language: str, source_path: str, build_dir: str) -> list:
+        """Compile-only command for a compiled language; the program or classes land in build_dir"""
+        if language == "java":
+            return ["/bin/sh", "-c", f"mkdir -p {build_dir} && javac -d {build_dir} {source_path}"]
+        compiler = "gcc" if language == "c" else "g++"
+        return ["/bin/sh", "-c", f"mkdir -p {build_dir} && {compiler} {source_path} -o {build_dir}/program"]
+    
+    def _run_built_command(self, language: str, source_path: str, build_dir: str) -> list:
+        """Command that runs a program built by _compile_command"""
+        if language == "java":
+            class_name = os.path.basename(source_path).replace('.java', '')
+            return ["java", "-cp", build_dir, class_name]
+        return [f"{build_dir}/program"]
+    
+    def _run_compiled(self, container, language: str, code: str, run_id: str,
+                      source_path: str, timeout: int) -> Tuple[int, bytes, bytes]:
+        """
+        Compile (or reuse an identical earlier build) and run, in the warm container
+        
+        Builds are copied out right after compiling, before any submitted code
+        runs, and kept on the host keyed by source digest; a hit is put back as
+        root-owned, read-only files, so no run can plant a build for another.
+        """
+        digest = hashlib.sha256(f"{language}\0{code}".encode("utf-8")).hexdigest()
+        with self._builds_lock:
+            build = self._builds.get(digest)
+            if build is not None:
+                self._builds.move_to_end(digest)
+        
+        compile_stderr = b""
+        if build is not None:
+            container.put_archive(f"/code/{run_id}", build)
+            build_dir = f"/code/{run_id}/build"
+        else:
+            build_dir = f"/tmp/{run_id}/build"
+            exit_code, (stdout, compile_stderr) = container.exec_run(
+                ["timeout", str(timeout)] + self._compile_command(language, source_path, build_dir),
+                workdir="/code", stdout=True, stderr=True, demux=True
+            )
+            if exit_code != 0:
+                return exit_code, stdout, compile_stderr
+            bits, _ = container.get_archive(build_dir)
+            self._store_build(digest, b"".join(bits))
+        
+        exit_code, (stdout, stderr) = container.exec_run(
+            ["timeout", str(timeout)] + self._run_built_command(language, source_path, build_dir),
+            workdir="/code", stdout=True, stderr=True, demux=True
+        )
+        return exit_code, stdout, (compile_stderr or b"") + (stderr or b"")
+    
+    def _store_build(self, digest: str, archive: bytes):
+        """Keep a build tar, rewritten as root-owned and not writable by others"""
+        src = tarfile.open(fileobj=io.BytesIO(archive))
+        buf = io.BytesIO()
+        with tarfile.open(fileobj=buf, mode="w") as tar:
+            for member in src.getmembers():
+                member.uid = member.gid = 0
+                member.uname = member.gname = "root"
+                member.mode &= 0o755
+                tar.addfile(member, src.extractfile(member) if member.isfile() else None)
+        with self._builds_lock:
+            self._builds[digest] = buf.getvalue()
+            self._builds.move_to_end(digest)
+            while len(self._builds) > self.BUILD_CACHE_MAX_ENTRIES:
+                self._builds.popitem(last=False)
+    
+    def _warm_container(self, scope: str, language: str):
+        """
+        Long-running sandbox container for one scope and language, started on first use
+        
+        Same image, limits and disabled network as one-shot runs; code is
+        exec'd inside it so per-run container create/start/teardown is skipped.
+        Containers are never shared between scopes, and idle ones are stopped.
+        Returns (container, run lock).
+        """
+        key = (scope, language)
+        with self._warm_lock:
+            self._reap_idle_warm()
+            entry = self._warm.get(key)
+            if entry is not None:
+                try:
+                    entry[0].reload()
+                    if entry[0].status == "running":
+                        entry[2] = time.monotonic()
+                        return entry[0], entry[1]
+                except docker.errors.NotFound:
+                    pass
+            
+            if not self._shutdown_registered:
+                atexit.register(self.shutdown)
+                self._shutdown_registered = True
+            
+            container = self.client.containers.run(
+                image=self.IMAGE_MAP[language],
+                command=["tail", "-f", "/dev/null"],  # idle until exec'd
+                working_dir="/code",
+                detach=True,
+                network_disabled=True,
+                mem_limit=settings.docker_memory_limit,
+                cpu_quota=settings.docker_cpu_limit * 100000,
+                cpu_period=100000,
+                auto_remove=True,
+                labels={"ai-code-agent": "warm-sandbox"},
+            )
+            entry = [container, threading.Lock(), time.monotonic()]
+            self._warm[key] = entry
+            logger.info("Started warm sandbox container", language=language, container=container.short_id)
+            return entry[0], entry[1]
+    
+    def _reap_idle_warm(self):
+        """Stop warm containers idle for WARM_IDLE_SECONDS (caller holds _warm_lock)"""
+        cutoff = time.monotonic() - self.WARM_IDLE_SECONDS
+        for key, (container, run_lock, last_used) in list(self._warm.items()):
+            if last_used < cutoff and not run_lock.locked():
+                del self._warm[key]
+                self._stop_quietly(container)
+    
+    def _discard_warm(self, scope: str, language: str):
+        """Drop a scope's warm container after a failure so the next run starts fresh"""
+        with self._warm_lock:
+            entry = self._warm.pop((scope, language), None)
+        if entry is not None:
+            self._stop_quietly(entry[0])
+    
+    @staticmethod
+    def _stop_quietly(container):
+        try:
+            container.stop(timeout=1)
+        except Exception:
+            pass
+    
+    def _execute_in_warm_container(self, code: str, language: str, timeout: int, scope: str) -> Dict[str, any]:
+        """Execute code with exec_run in the scope's warm container"""
+        container, run_lock = self._warm_container(scope, language)
+        
+        run_id = uuid.uuid4().hex
+        # Java needs the file named after its public class, conventionally Main
+        file_name = ("Main" if language == "java" else "main") + self.FILE_EXTENSIONS[language]
+        work_dir = f"/tmp/{run_id}"
+        source_path = f"/code/{run_id}/{file_name}"
+        command = ["timeout", str(timeout)] + self._build_command(language, source_path, work_dir)
+        
+        # One run at a time per container, so the cleanup kill below only hits this run
+        with run_lock:
+            # Ship the source as an in-memory tar: no host temp file, mount or unlink
+            container.put_archive("/code", self._source_archive(run_id, file_name, code))
+            start_time = time.time()
+            try:
+                if language in self.COMPILED_LANGUAGES:
+                    # Same source compiles to the same program: reuse the build across review iterations
+                    exit_code, stdout, stderr = self._run_compiled(
+                        container, language, code, run_id, source_path, timeout
+                    )
+                else:
+                    exit_code, (stdout, stderr) = container.exec_run(
+                        command, workdir="/code", stdout=True, stderr=True, demux=True
+                    )
+                elapsed_ms = (time.time() - start_time) * 1000
+            finally:
+                # Background processes outlive `timeout`: kill everything but PID 1 (the idle
+                # tail), then remove the run's files; extracted files are root-owned
+                container.exec_run(
+                    ["/bin/sh", "-c", f"kill -9 -1; rm -rf /code/{run_id} {work_dir}"], user="root"
+                )
+        
+        output = (stdout or b"").decode("utf-8", errors="replace")
+        error = (stderr or b"").decode("utf-8", errors="replace")
+        if exit_code == self.TIMEOUT_EXIT_CODE:
+            error = f"Execution timeout after {timeout} seconds"
+        
+        success = exit_code == 0
+        logger.info(
+            "Code execution completed",
+            language=language,
+            exit_code=exit_code,
+            elapsed_ms=round(elapsed_ms, 2),
+            success=success,
+            warm=True,
+        )
+        
+        return {
+            "success": success,
+            "output": output.strip(),
+            "error": error.strip(),
+            "exit_code": exit_code,
+            "execution_time_ms": round(elapsed_ms, 2),
+        }
+    
+    @staticmethod
+    def _source_archive(run_id: str, file_name: str, code: str) -> bytes:
+        """Tar holding <run_id>/<file_name>, readable by the sandbox's non-root user"""
+        data = code.encode("utf-8")
+        buf = io.BytesIO()
+        with tarfile.open(fileobj=buf, mode="w") as tar:
+            run_dir = tarfile.TarInfo(run_id)
+            run_dir.type = tarfile.DIRTYPE
+            run_dir.mode = 0o755
+            tar.addfile(run_dir)
+            source = tarfile.TarInfo(f"{run_id}/{file_name}")
+            source.size = len(data)
+            source.mode = 0o644
+            tar.addfile(source, io.BytesIO(data))
+        return buf.getvalue()
+    
+    def shutdown(self):
+        """Stop warm containers (they are auto-removed)"""
+        with self._warm_lock:
+            for container, _, _ in self._warm.values():
+                self._stop_quietly(container)
+            self._warm.clear()
+    
     def check_docker_available(self) -> bool:
         """Check if Docker is running"""
         try:
@@ -289,12 +564,17 @@ class CodeExecutor:
             return False
     
     def check_images_available(self) -> Dict[str, bool]:
-        """Check which Docker images are available"""
-        results = {}
-        for language, image in self.IMAGE_MAP.items():
-            try:
-                self.client.images.get(image)
-                results[language] = True
-            except:
-                results[language] = False
-        return results
+        """Check which Docker images are available (one images.list() call, cached briefly)"""
+        now = time.monotonic()
+        if self._images_checked_at is not None and now - self._images_checked_at < self.IMAGE_CHECK_TTL_SECONDS:
+            return dict(self._images_available)
+        
+        try:
+            tags = {tag for image in self.client.images.list() for tag in image.tags}
+        except Exception as e:
+            logger.warning("Could not list Docker images", error=str(e))
+            tags = set()
+        
+        self._images_available = {language: image in tags for language, image in self.IMAGE_MAP.items()}
+        self._images_checked_at = now
+        return dict(self._images_available)
@@ -0,0 +1,168 @@
+"""
+Adaptive (AIMD) concurrency limiting for LLM provider calls
+Grows the limit additively while calls are fast and halves it on 429/5xx or latency spikes
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from .config import get_settings
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+RATE_LIMIT_HEADERS = (
+    ("x-ratelimit-remaining-requests", "x-ratelimit-limit-requests"),
+    ("anthropic-ratelimit-requests-remaining", "anthropic-ratelimit-requests-limit"),
+)
+LOW_REMAINING_FRACTION = 0.1  # Pause when fewer than 10% of requests remain
+DEFAULT_PAUSE_SECONDS = 5.0
+EWMA_ALPHA = 0.2  # Weight of the newest latency sample
+ASYNC_POLL_SECONDS = 0.05  # How often async callers re-check for a free slot
+
+
+class AIMDLimiter:
+    """
+    Thread-safe concurrency limiter with additive-increase/multiplicative-decrease
+
+    Each call that finishes within the target latency raises the limit by
+    `increase`; an overload signal (429, 5xx, latency spike) multiplies it by
+    `decrease`. The limit is per process, so every queue worker adapts on its own.
+    """
+
+    def __init__(self, initial: float, minimum: float, maximum: float,
+                 target_latency: float, increase: float = 0.5, decrease: float = 0.5):
+        self.limit = float(initial)
+        self.minimum = float(minimum)
+        self.maximum = float(maximum)
+        self.target_latency = target_latency
+        self.increase = increase
+        self.decrease = decrease
+        self.in_flight = 0
+        self.mean_latency: Optional[float] = None
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Block until a slot is free and no provider pause is active"""
+        with self._cond:
+            while True:
+                wait = self._paused_until - time.monotonic()
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                self._cond.wait(timeout=wait if wait > 0 else None)
+
+    def try_acquire(self) -> float:
+        """Take a slot if one is free; return 0.0 on success or a suggested wait in seconds"""
+        with self._cond:
+            wait = self._paused_until - time.monotonic()
+            if wait > 0:
+                return wait
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return 0.0
+            return ASYNC_POLL_SECONDS
+
+    def release(self, latency: Optional[float] = None, overloaded: bool = False,
+                pause_seconds: float = 0.0):
+        """Free a slot and adjust the limit from the call's outcome"""
+        with self._cond:
+            self.in_flight -= 1
+            if latency is not None:
+                self.mean_latency = latency if self.mean_latency is None else (
+                    EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.mean_latency
+                )
+            spike = latency is not None and latency > 2 * self.target_latency
+            if overloaded or spike:
+                self.limit = max(self.minimum, self.limit * self.decrease)
+                logger.warning("LLM backpressure: reducing concurrency", limit=self.limit,
+                               latency=latency, overloaded=overloaded)
+            elif self.mean_latency is not None and self.mean_latency <= self.target_latency:
+                self.limit = min(self.maximum, self.limit + self.increase)
+            if pause_seconds > 0:
+                self._paused_until = max(self._paused_until, time.monotonic() + pause_seconds)
+            self._cond.notify_all()
+
+    def call(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run func under the limiter, feeding its latency and errors back"""
+        self.acquire()
+        start = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            status_code, pause = _inspect_error(e)
+            overloaded = status_code is not None and (status_code == 429 or status_code >= 500)
+            self.release(time.monotonic() - start if not overloaded else None,
+                         overloaded=overloaded, pause_seconds=pause)
+            raise
+        self.release(time.monotonic() - start)
+        return result
+
+    async def acall(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Async variant of call(): waits for a slot without blocking the event loop"""
+        while (wait := self.try_acquire()) > 0:
+            await asyncio.sleep(wait)
+        start = time.monotonic()
+        try:
+            result = await func(*args, **kwargs)
+        except Exception as e:
+            status_code, pause = _inspect_error(e)
+            overloaded = status_code is not None and (status_code == 429 or status_code >= 500)
+            self.release(time.monotonic() - start if not overloaded else None,
+                         overloaded=overloaded, pause_seconds=pause)
+            raise
+        self.release(time.monotonic() - start)
+        return result
+
+
+def _inspect_error(error: Exception):
+    """Extract the HTTP status and a pause duration from a provider error"""
+    response = getattr(error, "response", None)
+    status_code = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    headers = getattr(response, "headers", None) or {}
+
+    pause = 0.0
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            pause = float(retry_after)
+        except ValueError:
+            pause = DEFAULT_PAUSE_SECONDS
+    elif status_code == 429:
+        pause = DEFAULT_PAUSE_SECONDS
+
+    for remaining_key, limit_key in RATE_LIMIT_HEADERS:
+        try:
+            remaining = int(headers[remaining_key])
+            limit = int(headers[limit_key])
+        except (KeyError, ValueError):
+            continue
+        if limit and remaining < limit * LOW_REMAINING_FRACTION:
+            pause = max(pause, DEFAULT_PAUSE_SECONDS)
+        break
+
+    return status_code, pause
+
+
+# Singleton instance
+_llm_limiter = None
+_llm_limiter_lock = threading.Lock()
+
+
+def get_llm_limiter() -> AIMDLimiter:
+    """Get the shared LLM concurrency limiter (singleton pattern)"""
+    global _llm_limiter
+    if _llm_limiter is None:
+        with _llm_limiter_lock:
+            if _llm_limiter is None:
+                settings = get_settings()
+                _llm_limiter = AIMDLimiter(
+                    initial=settings.llm_initial_concurrency,
+                    minimum=1,
+                    maximum=settings.llm_max_concurrency,
+                    target_latency=settings.llm_target_latency_seconds,
+                )
+    return _llm_limiter
@@ -5,6 +5,7 @@ Handles environment variables and application settings
 
 from pydantic_settings import BaseSettings
 from pydantic import Field, validator
+from functools import lru_cache
 from typing import List
 import os
 from pathlib import Path
@@ -29,9 +30,21 @@ class Settings(BaseSettings):
     
     # Execution Limits
     max_iterations: int = Field(default=5, env="MAX_ITERATIONS", ge=1, le=10)
+    max_concurrent_questions: int = Field(default=4, env="MAX_CONCURRENT_QUESTIONS", ge=1)
+    max_concurrent_sandboxes: int = Field(default=2, env="MAX_CONCURRENT_SANDBOXES", ge=1)
     code_timeout_seconds: int = Field(default=30, env="CODE_TIMEOUT_SECONDS", ge=5, le=300)
     docker_memory_limit: str = Field(default="512m", env="DOCKER_MEMORY_LIMIT")
     docker_cpu_limit: int = Field(default=1, env="DOCKER_CPU_LIMIT")
+    docker_warm_containers: bool = Field(default=False, env="DOCKER_WARM_CONTAINERS")
+    
+    # LLM backpressure (AIMD concurrency per worker process)
+    llm_initial_concurrency: int = Field(default=4, env="LLM_INITIAL_CONCURRENCY", ge=1)
+    llm_max_concurrency: int = Field(default=16, env="LLM_MAX_CONCURRENCY", ge=1)
+    llm_target_latency_seconds: float = Field(default=20.0, env="LLM_TARGET_LATENCY_SECONDS", gt=0)
+    llm_cache_enabled: bool = Field(default=True, env="LLM_CACHE_ENABLED")
+    solution_cache_enabled: bool = Field(default=True, env="SOLUTION_CACHE_ENABLED")
+    # enabled: read and write; read-only: never write; replay: cache only, a miss is an error; off
+    validation_cache_mode: str = Field(default="enabled", env="VALIDATION_CACHE_MODE")
     
     # Database
     database_url: str = Field(default="sqlite:///./ai_agent.db", env="DATABASE_URL")
@@ -45,6 +58,7 @@ class Settings(BaseSettings):
     base_dir: Path = Path(__file__).parent.parent.parent
     input_dir: Path = base_dir / "data" / "input"
     output_dir: Path = base_dir / "data" / "output"
+    cache_dir: Path = base_dir / "data" / "cache"
     log_dir: Path = base_dir / "logs"
     docker_dir: Path = base_dir / "docker"
     
@@ -55,12 +69,13 @@ class Settings(BaseSettings):
             return [lang.strip().lower() for lang in v.split(",")]
         return v
     
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        # Create directories if they don't exist
-        self.input_dir.mkdir(parents=True, exist_ok=True)
-        self.output_dir.mkdir(parents=True, exist_ok=True)
-        self.log_dir.mkdir(parents=True, exist_ok=True)
+    @validator("validation_cache_mode")
+    def check_validation_cache_mode(cls, v):
+        """Accept only the known validation cache modes"""
+        v = v.strip().lower()
+        if v not in ("enabled", "read-only", "replay", "off"):
+            raise ValueError("validation_cache_mode must be enabled, read-only, replay or off")
+        return v
     
     class Config:
         env_file = ".env"
@@ -68,12 +83,17 @@ class Settings(BaseSettings):
         case_sensitive = False
 
 
-# Singleton instance
-_settings = None
+def _ensure_dirs(settings: Settings):
+    """Create the data, cache and log directories if they don't exist"""
+    settings.input_dir.mkdir(parents=True, exist_ok=True)
+    settings.output_dir.mkdir(parents=True, exist_ok=True)
+    settings.cache_dir.mkdir(parents=True, exist_ok=True)
+    settings.log_dir.mkdir(parents=True, exist_ok=True)
+
 
+@lru_cache(maxsize=1)
 def get_settings() -> Settings:
-    """Get application settings (singleton pattern)"""
-    global _settings
-    if _settings is None:
-        _settings = Settings()
-    return _settings
+    """Get application settings (parsed once per process; get_settings.cache_clear() resets)"""
+    settings = Settings()
+    _ensure_dirs(settings)
+    return settings
@@ -1,21 +1,111 @@
-from docx import Document
-from docx.shared import Pt
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.oxml import OxmlElement
-from docx.oxml.ns import qn
-
-def add_horizontal_line(doc):
-    paragraph = doc.add_paragraph()
-    p = paragraph._p
-    pPr = p.get_or_add_pPr()
-    pBdr = OxmlElement('w:pBdr')
-    pPr.insert(0, pBdr)
-    bottom = OxmlElement('w:bottom')
-    bottom.set(qn('w:val'), 'single')
-    bottom.set(qn('w:sz'), '10')
-    bottom.set(qn('w:space'), '1')
-    bottom.set(qn('w:color'), 'auto')
-    pBdr.append(bottom)
+"""
+Assignment .docx writer
+Streams word/document.xml paragraph by paragraph straight into the zip, so
+memory stays flat however many questions or how much code an assignment has.
+The static package parts are fixed byte strings.
+"""
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+_CONTENT_TYPES = (
+    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    b'<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    b'<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    b'<Default Extension="xml" ContentType="application/xml"/>'
+    b'<Override PartName="/word/document.xml" '
+    b'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    b'<Override PartName="/word/styles.xml" '
+    b'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+    b'</Types>'
+)
+
+_ROOT_RELS = (
+    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    b'<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    b'<Relationship Id="rId1" '
+    b'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    b'Target="word/document.xml"/>'
+    b'</Relationships>'
+)
+
+_DOCUMENT_RELS = (
+    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    b'<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    b'<Relationship Id="rId1" '
+    b'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    b'Target="styles.xml"/>'
+    b'</Relationships>'
+)
+
+# Normal plus the two heading styles the assignment uses (Word's default look)
+_STYLES = (
+    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    b'<w:styles xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+    b'<w:docDefaults><w:rPrDefault><w:rPr>'
+    b'<w:rFonts w:ascii="Calibri" w:hAnsi="Calibri" w:eastAsia="Calibri" w:cs="Calibri"/>'
+    b'<w:sz w:val="22"/><w:szCs w:val="22"/>'
+    b'</w:rPr></w:rPrDefault>'
+    b'<w:pPrDefault><w:pPr><w:spacing w:after="200" w:line="276" w:lineRule="auto"/></w:pPr></w:pPrDefault>'
+    b'</w:docDefaults>'
+    b'<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/><w:qFormat/></w:style>'
+    b'<w:style w:type="paragraph" w:styleId="Heading2"><w:name w:val="heading 2"/>'
+    b'<w:basedOn w:val="Normal"/><w:next w:val="Normal"/><w:qFormat/>'
+    b'<w:pPr><w:keepNext/><w:spacing w:before="200" w:after="0"/><w:outlineLvl w:val="1"/></w:pPr>'
+    b'<w:rPr><w:b/><w:color w:val="4F81BD"/><w:sz w:val="26"/><w:szCs w:val="26"/></w:rPr></w:style>'
+    b'<w:style w:type="paragraph" w:styleId="Heading3"><w:name w:val="heading 3"/>'
+    b'<w:basedOn w:val="Normal"/><w:next w:val="Normal"/><w:qFormat/>'
+    b'<w:pPr><w:keepNext/><w:spacing w:before="200" w:after="0"/><w:outlineLvl w:val="2"/></w:pPr>'
+    b'<w:rPr><w:b/><w:color w:val="4F81BD"/></w:rPr></w:style>'
+    b'</w:styles>'
+)
+
+_DOCUMENT_START = (
+    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    b'<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+)
+
+_DOCUMENT_END = (
+    b'<w:sectPr><w:pgSz w:w="12240" w:h="15840"/>'
+    b'<w:pgMar w:top="1440" w:right="1440" w:bottom="1440" w:left="1440" '
+    b'w:header="720" w:footer="720" w:gutter="0"/></w:sectPr>'
+    b'</w:body></w:document>'
+)
+
+_HORIZONTAL_LINE = (
+    b'<w:p><w:pPr><w:pBdr>'
+    b'<w:bottom w:val="single" w:sz="10" w:space="1" w:color="auto"/>'
+    b'</w:pBdr></w:pPr></w:p>'
+)
+
+_CONSOLAS = '<w:rPr><w:rFonts w:ascii="Consolas" w:hAnsi="Consolas" w:cs="Consolas"/></w:rPr>'
+
+# Characters XML 1.0 cannot carry at all (stray control bytes in program output)
+_INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+
+def _run_text(text: str) -> str:
+    """Run content for text: newlines become <w:br/>, tabs <w:tab/>, whitespace preserved"""
+    text = _INVALID_XML_CHARS.sub("", text)
+    lines = []
+    for line in text.split("\n"):
+        pieces = [f'<w:t xml:space="preserve">{escape(piece)}</w:t>' if piece else "" for piece in line.split("\t")]
+        lines.append("<w:tab/>".join(pieces))
+    return "<w:br/>".join(lines)
+
+
+def _paragraph(text: str, style: str = None, center: bool = False, run_props: str = "") -> bytes:
+    """One <w:p> holding a single run of text"""
+    ppr = ""
+    if style or center:
+        ppr = "<w:pPr>"
+        if style:
+            ppr += f'<w:pStyle w:val="{style}"/>'
+        if center:
+            ppr += '<w:jc w:val="center"/>'
+        ppr += "</w:pPr>"
+    return f"<w:p>{ppr}<w:r>{run_props}{_run_text(text)}</w:r></w:p>".encode("utf-8")
+
 
 def generate_assignment_docx(
     questions,
@@ -28,29 +118,36 @@ def generate_assignment_docx(
     student_rollno,
     student_batch,
 ):
-    doc = Document()
-
-    # Centered header
-    hdr = doc.add_paragraph(f"{subject_name} Assignment {assignment_number}")
-    hdr.alignment = WD_ALIGN_PARAGRAPH.CENTER
-
-    # Centered student info
-    info = doc.add_paragraph(f"Name: {student_name}\nClass: {student_class}\nDiv: {student_div}\nRoll No: {student_rollno}\nBatch: {student_batch}")
-    info.alignment = WD_ALIGN_PARAGRAPH.CENTER
-
-    # Horizontal line
-    add_horizontal_line(doc)
-
-    for q in questions:
-        doc.add_paragraph(f"Question {q['number']}", style="Heading 2")
-        doc.add_paragraph(q['text'])
-        doc.add_paragraph("Code:", style="Heading 3")
-        code_par = doc.add_paragraph()
-        code_run = code_par.add_run(q['code'])
-        code_run.font.name = 'Consolas'
-        doc.add_paragraph("Output:", style="Heading 3")
-        doc.add_paragraph(q['output'] or "[No Output]")
-        add_horizontal_line(doc)
-
-    doc.save(filename)
+    with zipfile.ZipFile(filename, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        zf.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        zf.writestr("_rels/.rels", _ROOT_RELS)
+        zf.writestr("word/_rels/document.xml.rels", _DOCUMENT_RELS)
+        zf.writestr("word/styles.xml", _STYLES)
+
+        with zf.open("word/document.xml", "w") as doc:
+            doc.write(_DOCUMENT_START)
+
+            # Centered header
+            doc.write(_paragraph(f"{subject_name} Assignment {assignment_number}", center=True))
+
+            # Centered student info
+            doc.write(_paragraph(
+                f"Name: {student_name}\nClass: {student_class}\nDiv: {student_div}\nRoll No: {student_rollno}\nBatch: {student_batch}",
+                center=True,
+            ))
+
+            # Horizontal line
+            doc.write(_HORIZONTAL_LINE)
+
+            for q in questions:
+                doc.write(_paragraph(f"Question {q['number']}", style="Heading2"))
+                doc.write(_paragraph(q['text']))
+                doc.write(_paragraph("Code:", style="Heading3"))
+                doc.write(_paragraph(q['code'], run_props=_CONSOLAS))
+                doc.write(_paragraph("Output:", style="Heading3"))
+                doc.write(_paragraph(q['output'] or "[No Output]"))
+                doc.write(_HORIZONTAL_LINE)
+
+            doc.write(_DOCUMENT_END)
+
     return filename
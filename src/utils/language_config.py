@@ -2,6 +2,7 @@
 Advanced language configurations
 """
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import List
 
 @dataclass
@@ -58,6 +59,9 @@ LANGUAGE_CONFIGS = {
     )
 }
 
+SUPPORTED_LANGUAGES = frozenset(LANGUAGE_CONFIGS)
+
+@lru_cache(maxsize=16)
 def get_language_config(language: str) -> LanguageConfig:
     return LANGUAGE_CONFIGS.get(language.lower(), LANGUAGE_CONFIGS["python"])
 
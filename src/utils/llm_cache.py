@@ -0,0 +1,150 @@
+"""
+Persistent LLM response, solution and validation caches
+LLM responses are keyed by (model, temperature, prompt); finished solutions by
+(model, temperature, question, language, requirements); validator tool output by (image, tools, code).
+All live in one SQLite file under cache_dir, one table each.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple, Type
+
+from .config import get_settings
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class _SqliteKV:
+    """Thread-safe key -> JSON value table in the shared cache database"""
+
+    def __init__(self, table: str, path: Optional[str] = None):
+        self.table = table
+        self.path = path or str(get_settings().cache_dir / "cache.sqlite")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT, created REAL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the stored value for key, or None on miss"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _put(self, key: str, value: Any):
+        """Store value for key; a failed write is logged, never raised"""
+        try:
+            with self._lock:
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, created) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), time.time()),
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning("Cache write failed", table=self.table, error=str(e))
+
+
+class SqliteLLMCache(_SqliteKV):
+    """Thread-safe (model, temperature, prompt) -> (response, tokens) cache"""
+
+    def __init__(self, path: Optional[str] = None):
+        super().__init__("llm_responses", path)
+
+    @staticmethod
+    def make_key(model: str, temperature: float, prompt: str) -> str:
+        """Hash the inputs that determine an LLM response"""
+        return hashlib.sha256(f"{model}|{temperature}|{prompt}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[str, int]]:
+        """Return (response_text, tokens) for key, or None on miss"""
+        value = super().get(key)
+        return tuple(value) if value is not None else None
+
+    def set(self, key: str, response: str, tokens: int):
+        """Store a response for key"""
+        self._put(key, [response, tokens])
+
+
+class SqliteSolutionCache(_SqliteKV):
+    """Thread-safe (model, temperature, question, language, requirements) -> (code, output) cache"""
+
+    def __init__(self, path: Optional[str] = None):
+        super().__init__("solutions", path)
+
+    @staticmethod
+    def make_key(model: str, temperature: float, question: str, language: str, requirements: str) -> str:
+        """Hash the question and the model settings that produced its solution"""
+        return hashlib.sha256(
+            f"{model}|{temperature}|{question}|{language}|{requirements}".encode("utf-8")
+        ).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[str, str]]:
+        """Return (code, output) for key, or None on miss"""
+        value = super().get(key)
+        return tuple(value) if value is not None else None
+
+    def set(self, key: str, code: str, output: str):
+        """Store a solved question's code and output"""
+        self._put(key, [code, output])
+
+
+class SqliteValidationCache(_SqliteKV):
+    """Thread-safe (image, tools, code) -> {tool: output} cache of validator runs"""
+
+    def __init__(self, path: Optional[str] = None):
+        super().__init__("validations", path)
+
+    @staticmethod
+    def make_key(image: str, script: str, code: str) -> str:
+        """Hash the inputs that determine validator output"""
+        return hashlib.sha256(f"{image}\0{script}\0{code}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, str]]:
+        """Return {tool: output} for key, or None on miss"""
+        return super().get(key)
+
+    def set(self, key: str, results: Dict[str, str]):
+        """Store a validator run's per-tool output"""
+        self._put(key, results)
+
+
+# Singleton instances, one per cache class
+_caches: Dict[type, _SqliteKV] = {}
+_caches_lock = threading.Lock()
+
+
+def _shared_cache(cls: Type[_SqliteKV], enabled: bool) -> Optional[_SqliteKV]:
+    """Get the process-wide instance of cls, or None when that cache is disabled"""
+    if not enabled:
+        return None
+    cache = _caches.get(cls)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(cls)
+            if cache is None:
+                cache = _caches[cls] = cls()
+    return cache
+
+
+def get_llm_cache() -> Optional[SqliteLLMCache]:
+    """Get the shared LLM cache, or None when disabled"""
+    return _shared_cache(SqliteLLMCache, get_settings().llm_cache_enabled)
+
+
+def get_solution_cache() -> Optional[SqliteSolutionCache]:
+    """Get the shared solution cache, or None when disabled"""
+    return _shared_cache(SqliteSolutionCache, get_settings().solution_cache_enabled)
+
+
+def get_validation_cache() -> Optional[SqliteValidationCache]:
+    """Get the shared validation cache, or None when VALIDATION_CACHE_MODE is off"""
+    return _shared_cache(SqliteValidationCache, get_settings().validation_cache_mode != "off")
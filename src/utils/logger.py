@@ -3,24 +3,37 @@ Structured logging for AI Code Agent
 Provides JSON logging with trace IDs for debugging
 """
 
+import atexit
 import structlog
 import logging
+import logging.handlers
+import queue
 import sys
 from pathlib import Path
 from .config import get_settings
 
 settings = get_settings()
 
+_queue_listener = None
+
 
 def setup_logging():
     """Configure structured logging"""
+    global _queue_listener
     
-    # Configure standard library logging
-    logging.basicConfig(
-        format="%(message)s",
-        stream=sys.stdout,
-        level=getattr(logging, settings.log_level),
-    )
+    # Configure standard library logging: callers only enqueue records, and a
+    # background listener thread does the stdout writes off the request path
+    if _queue_listener is None:
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(logging.Formatter("%(message)s"))
+        log_queue = queue.SimpleQueue()
+        _queue_listener = logging.handlers.QueueListener(log_queue, stream_handler)
+        _queue_listener.start()
+        atexit.register(_queue_listener.stop)  # flush what is still queued on exit
+        logging.basicConfig(
+            handlers=[logging.handlers.QueueHandler(log_queue)],
+            level=getattr(logging, settings.log_level),
+        )
     
     # Configure structlog
     structlog.configure(
@@ -0,0 +1,292 @@
+"""
+Shared Docker client and tool runner for the validators
+"""
+
+import atexit
+import io
+import os
+import re
+import shlex
+import tarfile
+import tempfile
+import threading
+import uuid
+from functools import lru_cache
+import time
+from typing import Dict, List, Tuple
+
+import docker
+
+from src.utils.config import get_settings
+from src.utils.llm_cache import get_validation_cache
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+TOOL_MARKER = "===TOOL:{}==="
+TIMEOUT_EXIT_CODE = 124  # exit status of coreutils/busybox `timeout`
+TIMEOUT_NOTE = "error: timed out after"  # start of the line _bounded adds on a timeout
+_MARKER_RE = re.compile(r"^===TOOL:(\S+)===$", re.MULTILINE)
+
+# RAM-backed scratch space for one-shot runs' bind mounts, when the host has it
+_SCRATCH_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+# Resolved image IDs are trusted this long before the tag is looked up again
+IMAGE_ID_TTL_SECONDS = 60
+_image_ids: Dict[str, Tuple[str, float]] = {}
+
+# Warm validator containers unused this long are stopped
+VALIDATOR_IDLE_SECONDS = 120
+
+# (scope, image) -> [container, run lock, last used]; a scope is one question's session
+_validators: Dict[Tuple[str, str], list] = {}
+_validators_lock = threading.Lock()
+_shutdown_registered = False
+
+
+@lru_cache(maxsize=1)
+def get_docker_client() -> docker.DockerClient:
+    """Docker client shared by every validator (DockerClient API calls are thread-safe)"""
+    return docker.from_env()
+
+
+def get_image_id(client: docker.DockerClient, image: str) -> str:
+    """
+    Resolve a validator image tag to its ID (pulling it if missing, as run would).
+    Cached for IMAGE_ID_TTL_SECONDS so a rebuilt or retagged image is picked up.
+    """
+    now = time.monotonic()
+    cached = _image_ids.get(image)
+    if cached is not None and now - cached[1] < IMAGE_ID_TTL_SECONDS:
+        return cached[0]
+    try:
+        image_id = client.images.get(image).id
+    except docker.errors.ImageNotFound:
+        image_id = client.images.pull(image).id
+    _image_ids[image] = (image_id, now)
+    return image_id
+
+
+def _run_image(client: docker.DockerClient, image: str, command: List[str], **kwargs):
+    """containers.run on the image's cached ID, re-resolving it once if that ID is gone (pruned image)"""
+    try:
+        return client.containers.run(get_image_id(client, image), command, **kwargs)
+    except docker.errors.APIError:
+        if _image_ids.pop(image, None) is None:
+            raise
+        logger.info("Validator image ID no longer usable, resolving the tag again", image=image)
+        return client.containers.run(get_image_id(client, image), command, **kwargs)
+
+
+def get_or_start_validator(client: docker.DockerClient, image: str, scope: str):
+    """
+    Long-running container for one scope and validator image, started on first use
+
+    Tools are exec'd inside it, so each validation skips container
+    create/start/teardown. Same limits and disabled network as one-shot runs.
+    Containers are never shared between scopes, and idle ones are stopped.
+    Returns (container, run lock).
+    """
+    global _shutdown_registered
+    key = (scope, image)
+    with _validators_lock:
+        _reap_idle_validators()
+        entry = _validators.get(key)
+        if entry is not None:
+            try:
+                entry[0].reload()
+                if entry[0].status == "running":
+                    entry[2] = time.monotonic()
+                    return entry[0], entry[1]
+            except docker.errors.NotFound:
+                pass
+
+        if not _shutdown_registered:
+            atexit.register(shutdown_validators)
+            _shutdown_registered = True
+
+        container = _run_image(
+            client,
+            image,
+            ["tail", "-f", "/dev/null"],  # idle until exec'd
+            working_dir="/code",
+            detach=True,
+            network_disabled=True,
+            mem_limit=settings.docker_memory_limit,
+            cpu_quota=settings.docker_cpu_limit * 100000,
+            cpu_period=100000,
+            auto_remove=True,
+            labels={"ai-code-agent": "warm-validator"},
+        )
+        entry = [container, threading.Lock(), time.monotonic()]
+        _validators[key] = entry
+        logger.info("Started warm validator container", image=image, container=container.short_id)
+        return entry[0], entry[1]
+
+
+def _reap_idle_validators():
+    """Kill warm validators idle for VALIDATOR_IDLE_SECONDS (caller holds _validators_lock)"""
+    cutoff = time.monotonic() - VALIDATOR_IDLE_SECONDS
+    for key, (container, run_lock, last_used) in list(_validators.items()):
+        if last_used < cutoff and not run_lock.locked():
+            del _validators[key]
+            _kill_quietly(container)
+
+
+def _discard_validator(image: str, scope: str):
+    """Drop a scope's warm validator after a failure so the next run starts fresh"""
+    with _validators_lock:
+        entry = _validators.pop((scope, image), None)
+    if entry is not None:
+        _kill_quietly(entry[0])
+
+
+def _kill_quietly(container):
+    try:
+        container.kill()
+    except Exception:
+        pass
+
+
+def shutdown_validators():
+    """Kill warm validator containers (they are auto-removed)"""
+    with _validators_lock:
+        for container, _, _ in _validators.values():
+            _kill_quietly(container)
+        _validators.clear()
+
+
+def run_fused(client: docker.DockerClient, image: str, file_name: str, code: str,
+              tools: Dict[str, List[str]], scope: str = None) -> Dict[str, str]:
+    """
+    Run several tools over one source file in a single container exec/start
+    (or return the cached output of an identical earlier run).
+    Tool commands run from the directory holding file_name, so they take
+    relative paths. The tools are independent reads of the file, so they run
+    concurrently in the background, each capped at code_timeout_seconds; once
+    all finish, each tool's output (stdout and stderr) is printed after a
+    marker line and split back out. With DOCKER_WARM_CONTAINERS on, runs of one
+    scope (a question's session id) reuse a container no other scope shares.
+    """
+    run = " ".join(f"{_bounded(command)} > .tool-{i}.out 2>&1 &" for i, command in enumerate(tools.values()))
+    report = "; ".join(f"echo '{TOOL_MARKER.format(name)}'; cat .tool-{i}.out" for i, name in enumerate(tools))
+    script = f"{run} wait; {report}"
+    # Tools report problems through non-zero exits; the script itself should not fail
+    command = ["/bin/sh", "-c", f"{script}; exit 0"]
+
+    # Identical code through the same image and tools gives the same output
+    cache = get_validation_cache()
+    key = None
+    if cache is not None:
+        key = cache.make_key(image, script, code)
+        hit = cache.get(key)
+        if hit is not None:
+            return hit
+        if settings.validation_cache_mode == "replay":
+            raise LookupError(f"No cached validation for this code in {image} (VALIDATION_CACHE_MODE=replay)")
+
+    output = None
+    if settings.docker_warm_containers and scope is not None:
+        try:
+            output = _exec_in_validator(client, image, scope, file_name, code, command)
+        except Exception as e:
+            logger.warning("Warm validator failed, using a one-shot container", image=image, error=str(e))
+            _discard_validator(image, scope)
+    if output is None:
+        output = _run_once(client, image, file_name, code, command)
+    results = split_tool_output(output.decode("utf-8", errors="replace"))
+
+    # Markers lost (e.g. a tool wrote over its output file): rerun those tools one by one
+    missing = [name for name in tools if name not in results]
+    if missing:
+        logger.warning("Fused validator output incomplete, running tools separately", image=image, tools=missing)
+        for name in missing:
+            results[name] = run_tool(client, image, file_name, code, tools[name])
+    # A timeout depends on host load, not the code, and a per-tool rerun means the
+    # fused run misbehaved: neither result should be replayed from the cache
+    timed_out = any(TIMEOUT_NOTE in out for out in results.values())
+    if key is not None and settings.validation_cache_mode == "enabled" and not (missing or timed_out):
+        cache.set(key, results)
+    return results
+
+
+def run_tool(client: docker.DockerClient, image: str, file_name: str, code: str, command: List[str]) -> str:
+    """Run a single tool over the source in a one-shot container and return its output"""
+    output = _run_once(client, image, file_name, code, ["/bin/sh", "-c", f"{_bounded(command)} 2>&1; exit 0"])
+    return output.decode("utf-8", errors="replace").strip("\n")
+
+
+def _bounded(command: List[str]) -> str:
+    """Shell fragment running command under `timeout`, noting in its output when it was cut off"""
+    limit = settings.code_timeout_seconds
+    return (
+        f"( timeout {limit} {shlex.join(command)}; "
+        f"[ $? -eq {TIMEOUT_EXIT_CODE} ] && echo '{TIMEOUT_NOTE} {limit} seconds' )"
+    )
+
+
+def _run_once(client: docker.DockerClient, image: str, file_name: str, code: str,
+              command: List[str]) -> bytes:
+    """Run command in a one-shot container with the source bind-mounted at /code"""
+    with tempfile.TemporaryDirectory(dir=_SCRATCH_DIR) as tmpdir:
+        with open(os.path.join(tmpdir, file_name), "w", encoding="utf-8") as f:
+            f.write(code)
+        # Foreground run: output is collected after the command exits, before removal
+        return _run_image(
+            client,
+            image,
+            command,
+            volumes={tmpdir: {"bind": "/code", "mode": "rw"}},
+            working_dir="/code",
+            network_disabled=True,
+            mem_limit=settings.docker_memory_limit,
+            cpu_quota=settings.docker_cpu_limit * 100000,
+            cpu_period=100000,
+            stderr=True,
+            stdout=True,
+            remove=True
+        )
+
+
+def _exec_in_validator(client: docker.DockerClient, image: str, scope: str, file_name: str, code: str,
+                       command: List[str]) -> bytes:
+    """Copy the source into the scope's warm validator container and exec command next to it"""
+    container, run_lock = get_or_start_validator(client, image, scope)
+    run_id = uuid.uuid4().hex
+    run_dir = f"/code/{run_id}"
+    # One run at a time per container, so the cleanup kill below only hits this run
+    with run_lock:
+        try:
+            container.put_archive("/code", _source_archive(run_id, file_name, code))
+            return container.exec_run(command, workdir=run_dir, stdout=True, stderr=True).output
+        finally:
+            # Kill anything a tool left behind (everything but PID 1, the idle tail),
+            # then remove the run's files; extracted files are root-owned
+            try:
+                container.exec_run(["/bin/sh", "-c", f"kill -9 -1; rm -rf {run_dir}"], user="root")
+            except Exception as e:
+                logger.warning("Warm validator cleanup failed", image=image, error=str(e))
+
+
+def _source_archive(run_id: str, file_name: str, code: str) -> bytes:
+    """Tar holding <run_id>/<file_name>; the directory is writable so compilers can emit outputs"""
+    data = code.encode("utf-8")
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w") as tar:
+        run_dir = tarfile.TarInfo(run_id)
+        run_dir.type = tarfile.DIRTYPE
+        run_dir.mode = 0o777
+        tar.addfile(run_dir)
+        source = tarfile.TarInfo(f"{run_id}/{file_name}")
+        source.size = len(data)
+        source.mode = 0o644
+        tar.addfile(source, io.BytesIO(data))
+    return buf.getvalue()
+
+
+def split_tool_output(output: str) -> Dict[str, str]:
+    """Map tool name -> output for text produced by a run_fused script"""
+    parts = _MARKER_RE.split(output)
+    # parts = [preamble, name1, out1, name2, out2, ...]
+    return {name: out.strip("\n") for name, out in zip(parts[1::2], parts[2::2])}
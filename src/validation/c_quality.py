@@ -1,4 +1,4 @@
-import docker, os, tempfile
+from src.validation._docker import get_docker_client, run_fused
 from src.utils.logger import get_logger
 from src.utils.config import get_settings
 
@@ -8,28 +8,10 @@ settings = get_settings()
 class CValidator:
     IMAGE = "ai-agent-c:latest"
     def __init__(self):
-        self.client = docker.from_env()
-    def validate(self, code: str) -> dict:
-        with tempfile.TemporaryDirectory() as tmpdir:
-            code_path = os.path.join(tmpdir, "code.c")
-            with open(code_path, "w", encoding="utf-8") as f:
-                f.write(code)
-            out1 = self.run_tool(tmpdir, ["cppcheck", "--enable=all", "/code/code.c"])
-            out2 = self.run_tool(tmpdir, ["/bin/sh", "-c", "gcc /code/code.c -o /code/a.out"])
-            return {"cppcheck": out1, "gcc": out2}
-    def run_tool(self, mount_dir, command):
-        container = self.client.containers.run(
-            self.IMAGE,
-            command,
-            volumes={mount_dir: {"bind": "/code", "mode": "rw"}},
-            working_dir="/code",
-            network_disabled=True,
-            mem_limit=settings.docker_memory_limit,
-            cpu_quota=settings.docker_cpu_limit * 100000,
-            cpu_period=100000,
-            detach=True,
-            stderr=True,
-            stdout=True,
-            remove=True
-        )
-        return container.logs(stdout=True, stderr=True).decode("utf-8")
+        self.client = get_docker_client()
+    def validate(self, code: str, scope: str = None) -> dict:
+        # Both tools in one container exec
+        return run_fused(self.client, self.IMAGE, "code.c", code, {
+            "cppcheck": ["cppcheck", "--enable=all", "code.c"],
+            "gcc": ["gcc", "code.c", "-o", "a.out"],
+        }, scope=scope)
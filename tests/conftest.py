@@ -0,0 +1,6 @@
+"""
+Shared test setup: settings load at import time and require a Groq key
+"""
+import os
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
@@ -0,0 +1,41 @@
+"""
+Tests for pulling the first fenced code block out of an LLM response
+"""
+import pytest
+
+from src.agent.nodes import _FENCE_RE
+
+
+def _first_block(text):
+    match = _FENCE_RE.search(text)
+    return match.group(1) if match else None
+
+
+def test_block_without_language_tag():
+    assert _first_block("Here:\n```\nprint('hi')\n```\n") == "print('hi')"
+
+
+@pytest.mark.parametrize("tag", ["python", "cpp", "c++", "c#", "JavaScript"])
+def test_block_with_language_tag(tag):
+    assert _first_block(f"```{tag}\nx = 1\n```") == "x = 1"
+
+
+def test_first_of_several_blocks_wins():
+    text = (
+        "Solution:\n```python\ndef f():\n    return 1\n```\n"
+        "Usage:\n```python\nprint(f())\n```\n"
+    )
+    assert _first_block(text) == "def f():\n    return 1"
+
+
+def test_tilde_fence_and_indented_close():
+    assert _first_block("~~~go\nfmt.Println(1)\n  ~~~") == "fmt.Println(1)"
+
+
+def test_multiline_body_is_kept_verbatim():
+    body = "int main() {\n\n    return 0;\n}"
+    assert _first_block(f"```c\n{body}\n```") == body
+
+
+def test_unfenced_text_does_not_match():
+    assert _first_block("print('no fences here')") is None
@@ -0,0 +1,63 @@
+"""
+Tests for the streaming .docx writer
+"""
+import zipfile
+from xml.etree import ElementTree
+
+from src.utils.docgen import generate_assignment_docx
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def _write(tmp_path, questions):
+    path = tmp_path / "assignment.docx"
+    generate_assignment_docx(
+        questions, str(path), "DSA", 3, "Ada", "SE", "A", "42", "B1",
+    )
+    return path
+
+
+def _document_text(path) -> str:
+    with zipfile.ZipFile(path) as zf:
+        root = ElementTree.fromstring(zf.read("word/document.xml"))
+    return "".join(t.text or "" for t in root.iter(f"{W}t"))
+
+
+def test_output_is_a_valid_docx_package(tmp_path):
+    path = _write(tmp_path, [{"number": 1, "text": "Sum a list", "code": "print(1)", "output": "1"}])
+
+    assert zipfile.is_zipfile(path)
+    with zipfile.ZipFile(path) as zf:
+        assert zf.testzip() is None
+        names = set(zf.namelist())
+        assert {"[Content_Types].xml", "_rels/.rels", "word/document.xml",
+                "word/_rels/document.xml.rels", "word/styles.xml"} <= names
+        # Every package part is well-formed XML
+        for name in names:
+            ElementTree.fromstring(zf.read(name))
+        content_types = zf.read("[Content_Types].xml").decode("utf-8")
+    assert 'PartName="/word/document.xml"' in content_types
+
+
+def test_text_is_escaped_and_control_chars_dropped(tmp_path):
+    code = 'if a < b && c > d:\n\tprint("x")\x00\x1b'
+    path = _write(tmp_path, [{"number": 1, "text": "Compare", "code": code, "output": ""}])
+
+    text = _document_text(path)
+    assert 'if a < b && c > d:' in text
+    assert 'print("x")' in text
+    assert "\x00" not in text and "\x1b" not in text
+    assert "[No Output]" in text
+
+
+def test_every_question_is_written_in_order(tmp_path):
+    questions = [
+        {"number": n, "text": f"Question text {n}", "code": f"code_{n}()", "output": f"out {n}"}
+        for n in range(1, 4)
+    ]
+    text = _document_text(_write(tmp_path, questions))
+
+    positions = [text.index(f"Question {n}") for n in range(1, 4)]
+    assert positions == sorted(positions)
+    for n in range(1, 4):
+        assert f"code_{n}()" in text and f"out {n}" in text
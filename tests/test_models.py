@@ -0,0 +1,52 @@
+"""
+Tests for job id generation and the job_id column type
+"""
+import time
+import uuid
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from src.api.models import Base, Job, User, new_job_id
+
+
+def test_new_job_id_is_a_canonical_uuid7():
+    job_id = new_job_id()
+    parsed = uuid.UUID(job_id)
+    assert str(parsed) == job_id
+    assert parsed.version == 7
+    assert parsed.variant == uuid.RFC_4122
+
+
+def test_new_job_ids_are_time_ordered():
+    ids = []
+    for _ in range(5):
+        ids.append(new_job_id())
+        time.sleep(0.002)  # ordering is by millisecond timestamp
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+
+
+def test_new_job_ids_within_one_millisecond_are_unique():
+    ids = [new_job_id() for _ in range(1000)]
+    assert len(set(ids)) == len(ids)
+
+
+def test_job_id_reads_back_canonical_whatever_was_written():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add(User(username="ada", email="ada@example.com", hashed_password="x"))
+    session.commit()
+    user_id = session.execute(select(User.id)).scalar_one()
+
+    job_id = new_job_id()
+    session.add(Job(job_id=uuid.UUID(job_id).hex, user_id=user_id, input_file_path="in.txt"))
+    session.commit()
+
+    assert session.execute(select(Job.job_id)).scalar_one() == job_id
+    # Either spelling finds the row
+    assert session.execute(select(Job.id).where(Job.job_id == job_id)).scalar_one_or_none() is not None
+    assert session.execute(select(Job.id).where(Job.job_id == uuid.UUID(job_id).hex)).scalar_one_or_none() is not None
+    session.close()
+    engine.dispose()
@@ -0,0 +1,40 @@
+"""
+Tests for splitting fused validator output back into per-tool output
+"""
+from src.validation._docker import TOOL_MARKER, split_tool_output
+
+
+def _fused(*pairs, preamble=""):
+    return preamble + "".join(f"{TOOL_MARKER.format(name)}\n{out}\n" for name, out in pairs)
+
+
+def test_each_tool_gets_its_own_output():
+    output = _fused(("pylint", "code.py:1:0: C0114 missing docstring"), ("flake8", ""), ("black", "would reformat"))
+
+    assert split_tool_output(output) == {
+        "pylint": "code.py:1:0: C0114 missing docstring",
+        "flake8": "",
+        "black": "would reformat",
+    }
+
+
+def test_multiline_output_and_preamble():
+    output = _fused(("gcc", "a.c:1: error: x\na.c:2: warning: y"), preamble="noise before markers\n")
+
+    assert split_tool_output(output) == {"gcc": "a.c:1: error: x\na.c:2: warning: y"}
+
+
+def test_tool_names_with_symbols():
+    assert split_tool_output(_fused(("g++", "ok"), ("cppcheck", "")))["g++"] == "ok"
+
+
+def test_marker_text_inside_a_line_is_not_a_marker():
+    output = _fused(("eslint", f"echo {TOOL_MARKER.format('fake')} here"))
+
+    assert split_tool_output(output) == {"eslint": f"echo {TOOL_MARKER.format('fake')} here"}
+
+
+def test_missing_markers_leave_tools_out():
+    # run_fused reruns any tool missing from the result on its own
+    assert split_tool_output("no markers at all") == {}
+    assert "black" not in split_tool_output(_fused(("pylint", "x")))
@@ -1,29 +1,65 @@
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
-import subprocess
+from concurrent.futures import ProcessPoolExecutor
 import os
 import time
-import sys
+
+from src.utils.logger import get_logger, setup_logging
+
+logger = get_logger(__name__)
 
 INPUT_DIR = "data/input"
+OUTPUT_DIR = "data/output"
+# Jobs processed at once; each worker process imports the agent stack once and is reused
+WATCHER_WORKERS = int(os.getenv("WATCHER_WORKERS", "2"))
+
+
+def _preimport():
+    """Worker initializer: pay the heavy imports (LangChain, Docker, graph) once per worker"""
+    import src.agent.runner  # noqa: F401
+
+    setup_logging()
+
+
+def process(path):
+    """Run one assignment file through the batch runner; returns the .docx path"""
+    from src.agent.runner import run_batch_job
+
+    output_path, _ = run_batch_job(path, OUTPUT_DIR)
+    return output_path
+
+
+def _report(path, future):
+    try:
+        logger.info("✅ Job processed", path=path, output=future.result())
+    except Exception as e:
+        logger.warning("❌ Job failed", path=path, error=str(e))
+
 
 class AssignmentHandler(FileSystemEventHandler):
+    def __init__(self, pool):
+        self.pool = pool
+
     def on_created(self, event):
         if event.is_directory or not event.src_path.endswith(".txt"):
             return
-        print(f"New job detected: {event.src_path}")
-        subprocess.run([sys.executable, "test_graph.py", event.src_path])
+        logger.info("New job detected", path=event.src_path)
+        future = self.pool.submit(process, event.src_path)
+        future.add_done_callback(lambda f, path=event.src_path: _report(path, f))
 
 
 if __name__ == "__main__":
+    setup_logging()
+    pool = ProcessPoolExecutor(max_workers=WATCHER_WORKERS, initializer=_preimport)
     observer = Observer()
-    handler = AssignmentHandler()
+    handler = AssignmentHandler(pool)
     observer.schedule(handler, path=INPUT_DIR, recursive=False)
     observer.start()
-    print(f"Watching {INPUT_DIR} for jobs...")
+    logger.info("Watching for jobs", input_dir=INPUT_DIR)
     try:
         while True:
             time.sleep(1)
     except KeyboardInterrupt:
         observer.stop()
     observer.join()
+    pool.shutdown(wait=True)